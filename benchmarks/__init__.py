@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Benchmarks must not touch the real data directory (queue journals, setup
+# panels, command tree hash, loudness cache). Every path in Config derives from
+# DATA_DIR, so this has to run before config is imported.
+_data_dir = tempfile.TemporaryDirectory(prefix='konoha-bench-')
+os.environ['DATA_DIR'] = _data_dir.name
+os.environ.setdefault('QUEUE_JOURNAL_ENABLED', 'false')
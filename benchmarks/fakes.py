@@ -0,0 +1,195 @@
+"""In-memory stand-ins for yt-dlp, FFmpeg and Discord voice used by the benchmarks."""
+import copy
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from unittest import mock
+import discord
+
+RECORDED_INFO_PATH = os.path.join(os.path.dirname(__file__), 'data', 'recorded_info.json')
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+
+with open(RECORDED_INFO_PATH, encoding='utf-8') as handle:
+    RECORDED_INFO = json.load(handle)
+
+
+class FakeYoutubeDL:
+    """Replays recorded info dicts instead of calling out to the network."""
+
+    _counter = itertools.count()
+    latency = 0.0  # Simulated extraction time (runs in the extraction thread)
+
+    def __init__(self, options=None):
+        self.options = options or {}
+
+    def extract_info(self, query, download=False):
+        if self.latency:
+            time.sleep(self.latency)
+        recorded = copy.deepcopy(RECORDED_INFO[next(self._counter) % len(RECORDED_INFO)])
+        if query.startswith('ytsearch'):
+            return {'_type': 'playlist', 'entries': [recorded]}
+        return recorded
+
+
+class FakePCMAudio(discord.AudioSource):
+    """Serves a fixed number of silent PCM frames in place of an ffmpeg process."""
+
+    def __init__(self, source=None, *, frames=3000, **kwargs):
+        self.remaining = frames
+        self.frame = bytes(FRAME_SIZE)
+
+    def read(self):
+        if self.remaining <= 0:
+            return b''
+        self.remaining -= 1
+        return self.frame
+
+    def cleanup(self):
+        self.remaining = 0
+
+
+class FakeMember:
+    def __init__(self, member_id, bot=False):
+        self.id = member_id
+        self.bot = bot
+        self.display_name = f"user-{member_id}"
+        self.mention = f"<@{member_id}>"
+        self.voice = None
+
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeVoiceChannel:
+    def __init__(self, channel_id, guild, bitrate=96000, realtime=False):
+        self.id = channel_id
+        self.guild = guild
+        self.bitrate = bitrate
+        self.realtime = realtime
+        self.members = []
+        self.clients = []
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        self.edits += 1
+
+    async def connect(self, **kwargs):
+        client = FakeVoiceClient(self, realtime=self.realtime)
+        self.clients.append(client)
+        return client
+
+
+class FakeGuild:
+    def __init__(self, guild_id, realtime_voice=False):
+        self.id = guild_id
+        self.me = FakeMember(guild_id + 1, bot=True)
+        self.voice_channel = FakeVoiceChannel(guild_id + 2, self, realtime=realtime_voice)
+        self.channels = [self.voice_channel]
+
+    def get_member(self, member_id):
+        return None
+
+    def get_channel(self, channel_id):
+        return next((channel for channel in self.channels if channel.id == channel_id), None)
+
+
+class FakeVoiceClient:
+    """Stand-in for discord.VoiceClient.
+
+    With ``realtime=True`` a thread reads the source every 20ms like discord.py's
+    AudioPlayer and invokes ``after`` when the source is exhausted or stopped.
+    """
+
+    def __init__(self, channel, realtime=False):
+        self.channel = channel
+        self.guild = channel.guild
+        self.realtime = realtime
+        self.source = None
+        self.frames_sent = 0
+        self.connected = True
+        self._after = None
+        self._playing = False
+        self._paused = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_connected(self):
+        return self.connected
+
+    def is_playing(self):
+        return self._playing and not self._paused
+
+    def is_paused(self):
+        return self._playing and self._paused
+
+    def play(self, source, *, after=None, **kwargs):
+        self.source = source
+        self._after = after
+        self._playing = True
+        self._paused = False
+        if self.realtime:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True)
+            self._thread.start()
+
+    def _run(self, stop):
+        next_frame = time.perf_counter()
+        while not stop.is_set():
+            if self._paused:
+                time.sleep(0.02)
+                continue
+            if not self.source.read():
+                break
+            self.frames_sent += 1
+            next_frame += 0.02
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+        self._playing = False
+        self.source.cleanup()
+        if self._after:
+            self._after(None)
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+
+    def stop(self):
+        if self._thread:
+            self._stop.set()
+        self._playing = False
+
+    def shutdown(self):
+        """Stop playback without invoking the after callback."""
+        self._after = None
+        self.stop()
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, force=False):
+        self.connected = False
+        self.stop()
+
+
+def patch_media(track_frames=3000, extract_latency=0.0):
+    """Patch yt-dlp and FFmpeg with the in-memory fakes; returns an ExitStack."""
+    stack = ExitStack()
+    stack.enter_context(mock.patch('yt_dlp.YoutubeDL', FakeYoutubeDL))
+    stack.enter_context(mock.patch.object(FakeYoutubeDL, 'latency', extract_latency))
+    stack.enter_context(mock.patch.object(
+        discord, 'FFmpegPCMAudio', functools.partial(FakePCMAudio, frames=track_frames)
+    ))
+    return stack
+
+
+def attach_voice(music_player, guild, realtime=False):
+    """Give a music player a connected fake voice client."""
+    music_player.voice_client = FakeVoiceClient(guild.voice_channel, realtime=realtime)
+    return music_player.voice_client
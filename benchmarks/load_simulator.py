@@ -0,0 +1,283 @@
+"""Multi-guild load simulator.
+
+Drives a real MusicBot with many simulated guilds sending /play, /skip,
+setup-channel song requests and panel button presses against stubbed Discord
+REST/gateway objects and a fake extractor. Reports event-loop lag percentiles,
+command latency and CPU cost per active stream.
+
+Usage:
+    python -m benchmarks.load_simulator --guilds 200 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import discord
+from bot.music_bot import MusicBot
+from bot.commands import MusicCommands, SetupControlView
+from .fakes import FakeGuild, FakeMember, patch_media
+
+ACTIONS = ('play', 'skip', 'setup_message', 'button')
+
+
+class FakeVoiceState:
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakePermissions:
+    manage_messages = True
+    administrator = True
+
+
+class FakeUser(FakeMember):
+    def __init__(self, member_id, channel):
+        super().__init__(member_id)
+        self.voice = FakeVoiceState(channel)
+        self.guild_permissions = FakePermissions()
+
+
+class FakeMessage:
+    """A message in a fake text channel; REST calls only cost the simulated latency."""
+
+    def __init__(self, channel, author, content="", embeds=None):
+        self.id = random.getrandbits(62)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = embeds or []
+        self.created_at = discord.utils.utcnow()
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, **kwargs):
+        await self.channel.rest()
+
+    async def delete(self, **kwargs):
+        await self.channel.rest()
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id, guild, rest_latency):
+        self.id = channel_id
+        self.guild = guild
+        self.rest_latency = rest_latency
+        self.rest_calls = 0
+        self.messages = []
+
+    async def rest(self):
+        self.rest_calls += 1
+        await asyncio.sleep(self.rest_latency)
+
+    async def send(self, content=None, **kwargs):
+        await self.rest()
+        message = FakeMessage(self, None, content or "", [kwargs['embed']] if kwargs.get('embed') else None)
+        self.messages = (self.messages + [message])[-20:]
+        return message
+
+    async def history(self, limit=None):
+        for message in reversed(self.messages[-(limit or 20):]):
+            yield message
+
+    async def purge(self, limit=None):
+        await self.rest()
+        return []
+
+    async def delete_messages(self, messages):
+        await self.rest()
+
+    def get_partial_message(self, message_id):
+        return next((message for message in self.messages if message.id == message_id), FakeMessage(self, None))
+
+
+class FakeResponse:
+    def __init__(self, channel):
+        self.channel = channel
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+        await self.channel.rest()
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+        await self.channel.rest()
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        await self.channel.rest()
+
+
+class FakeFollowup:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def send(self, *args, **kwargs):
+        await self.channel.rest()
+
+    async def edit_message(self, *args, **kwargs):
+        await self.channel.rest()
+
+
+class FakeInteraction:
+    def __init__(self, guild, channel, user, message=None):
+        self.guild = guild
+        self.channel = channel
+        self.user = user
+        self.message = message
+        self.response = FakeResponse(channel)
+        self.followup = FakeFollowup(channel)
+
+    async def edit_original_response(self, **kwargs):
+        await self.channel.rest()
+
+
+class SimulatedGuild:
+    """One guild issuing a random mix of commands at a fixed average rate."""
+
+    QUERIES = ("never gonna give you up", "despacito", "bohemian rhapsody", "teen spirit", "gangnam style")
+
+    def __init__(self, simulator, index):
+        self.simulator = simulator
+        bot = simulator.bot
+        self.guild = FakeGuild((index + 1) << 22, realtime_voice=True)
+        self.text_channel = FakeTextChannel(self.guild.id + 3, self.guild, simulator.rest_latency)
+        self.guild.channels.append(self.text_channel)
+        self.user = FakeUser(self.guild.id + 4, self.guild.voice_channel)
+        self.guild.voice_channel.members = [self.guild.me, self.user]
+        bot.setup_channels[self.guild.id] = self.text_channel.id
+        self.view = SetupControlView(bot, self.text_channel.id, self.guild.id)
+
+    def interaction(self):
+        return FakeInteraction(self.guild, self.text_channel, self.user, self.text_channel.messages[-1:] or None)
+
+    async def run(self, deadline, rate):
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.expovariate(rate))
+            action = random.choices(ACTIONS, weights=(4, 1, 3, 2))[0]
+            started = time.perf_counter()
+            try:
+                await self.perform(action)
+            except Exception as e:
+                self.simulator.errors[action] = self.simulator.errors.get(action, 0) + 1
+                logging.debug(f"{action} failed: {e}")
+            self.simulator.latencies[action].append(time.perf_counter() - started)
+
+    async def perform(self, action):
+        cog = self.simulator.cog
+        if action == 'play':
+            await cog.play_slash.callback(cog, self.interaction(), random.choice(self.QUERIES))
+        elif action == 'skip':
+            await cog.skip_slash.callback(cog, self.interaction())
+        elif action == 'setup_message':
+            message = FakeMessage(self.text_channel, self.user, random.choice(self.QUERIES))
+            await self.simulator.bot.on_message(message)
+        else:
+            button = random.choice((self.view.pause_resume_button, self.view.skip_button, self.view.queue_button))
+            await button.callback(self.interaction())
+
+
+class LoadSimulator:
+    def __init__(self, bot, guilds, rest_latency):
+        self.bot = bot
+        self.rest_latency = rest_latency
+        self.cog = MusicCommands(bot)
+        self.latencies = {action: [] for action in ACTIONS}
+        self.errors = {}
+        self.loop_lag = []
+        self.active_stream_samples = []
+        self.guilds = [SimulatedGuild(self, index) for index in range(guilds)]
+
+    async def measure_loop_lag(self, deadline, interval=0.05):
+        while time.perf_counter() < deadline:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag.append(max(0.0, time.perf_counter() - expected))
+
+    async def sample_streams(self, deadline):
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(1)
+            self.active_stream_samples.append(sum(
+                1 for music_player in self.bot.music_players.values()
+                if music_player.voice_client and music_player.voice_client.is_playing()
+            ))
+
+    async def run(self, duration, actions_per_minute):
+        deadline = time.perf_counter() + duration
+        rate = actions_per_minute / 60.0
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        await asyncio.gather(
+            self.measure_loop_lag(deadline),
+            self.sample_streams(deadline),
+            *(guild.run(deadline, rate) for guild in self.guilds)
+        )
+        return self.report(time.process_time() - cpu_started, time.perf_counter() - wall_started)
+
+    def report(self, cpu_seconds, wall_seconds):
+        def percentiles(samples):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+            return {'n': len(ordered), 'p50_ms': pick(0.5), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99), 'max_ms': pick(1.0)}
+
+        average_streams = (
+            sum(self.active_stream_samples) / len(self.active_stream_samples) if self.active_stream_samples else 0
+        )
+        cpu_percent = cpu_seconds / wall_seconds * 100
+        return {
+            'guilds': len(self.guilds),
+            'duration_s': round(wall_seconds, 1),
+            'event_loop_lag': percentiles(self.loop_lag),
+            'command_latency': {action: percentiles(samples) for action, samples in self.latencies.items()},
+            'errors': self.errors,
+            'average_active_streams': round(average_streams, 1),
+            'cpu_percent': round(cpu_percent, 1),
+            'cpu_percent_per_stream': round(cpu_percent / average_streams, 3) if average_streams else None
+        }
+
+
+async def simulate(args):
+    async with MusicBot() as bot:
+        simulator = LoadSimulator(bot, args.guilds, args.rest_latency)
+        report = await simulator.run(args.duration, args.actions_per_minute)
+        for music_player in list(bot.music_players.values()):
+            music_player.queue.clear()
+        for guild in simulator.guilds:
+            for client in guild.guild.voice_channel.clients:
+                client.shutdown()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many guilds against one MusicBot process")
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run")
+    parser.add_argument('--actions-per-minute', type=float, default=6.0, help="Average commands per guild per minute")
+    parser.add_argument('--track-seconds', type=float, default=30.0, help="Length of each fake track")
+    parser.add_argument('--extract-latency', type=float, default=0.3, help="Simulated yt-dlp extraction time")
+    parser.add_argument('--rest-latency', type=float, default=0.05, help="Simulated Discord REST round trip")
+    parser.add_argument('--output', help="Write the report to a JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with patch_media(track_frames=int(args.track_seconds * 50), extract_latency=args.extract_latency):
+        report = asyncio.run(simulate(args))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Offline benchmark suite for the playback pipeline.
+
+Runs entirely in memory: yt-dlp is replaced by recorded info dicts, FFmpeg by a
+silent PCM source and the voice connection by a fake voice client.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--output FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import discord
+from bot.music_bot import MusicBot
+from bot.commands import SetupControlView
+from bot.queue_manager import QueueManager
+from bot.utils import YTDLSource
+from bot.crossfade import CrossfadeSource
+from .fakes import FakeGuild, FakeMember, FakePCMAudio, RECORDED_INFO, attach_voice, patch_media
+
+
+def summarize(samples):
+    """Summarize per-operation timings (seconds) in microseconds."""
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'mean_us': round(statistics.fmean(ordered) * 1e6, 3),
+        'p50_us': round(ordered[len(ordered) // 2] * 1e6, 3),
+        'p95_us': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6, 3),
+        'min_us': round(ordered[0] * 1e6, 3)
+    }
+
+
+def time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def time_async_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def make_song(index, requester):
+    recorded = RECORDED_INFO[index % len(RECORDED_INFO)]
+    return {
+        'title': recorded['title'],
+        'url': recorded['webpage_url'],
+        'duration': recorded['duration'],
+        'uploader': recorded['uploader'],
+        'thumbnail': recorded['thumbnail'],
+        'platform': 'youtube',
+        'requester': requester
+    }
+
+
+def bench_queue_manager():
+    """QueueManager operations at 10, 1k and 10k entries."""
+    requester = FakeMember(1)
+    results = {}
+    for size in (10, 1000, 10000):
+        queue = QueueManager()
+        for index in range(size):
+            queue.add(make_song(index, requester))
+        repeat = 2000 if size <= 1000 else 200
+        extra = make_song(size, requester)
+
+        def add_and_pop_back():
+            queue.add(extra)
+            queue.queue.pop()
+
+        def rotate():
+            queue.add(queue.get_next())
+
+        def front_and_pop():
+            queue.add_to_front(extra)
+            queue.get_next()
+
+        def remove_middle():
+            queue.queue.insert(size // 2, queue.remove(size // 2))
+
+        results[f'queue_{size}'] = {
+            'add': time_calls(add_and_pop_back, repeat),
+            'get_next_add': time_calls(rotate, repeat),
+            'add_to_front_get_next': time_calls(front_and_pop, repeat),
+            'remove_middle': time_calls(remove_middle, repeat),
+            'get_all': time_calls(queue.get_all, repeat),
+            'shuffle': time_calls(queue.shuffle, max(20, repeat // 20))
+        }
+    return results
+
+
+def bench_audio_source():
+    """Per-frame cost of reading from the audio source with volume scaling and crossfading."""
+    frames = 5000
+    source = YTDLSource(FakePCMAudio(frames=frames), data=RECORDED_INFO[0], volume=0.5)
+
+    # Passthrough: no fade in progress
+    passthrough = CrossfadeSource(
+        YTDLSource(FakePCMAudio(frames=frames), data=RECORDED_INFO[0], volume=0.5), fade_frames=frames
+    )
+    # Fading for the whole run
+    fading = CrossfadeSource(
+        YTDLSource(FakePCMAudio(frames=frames), data=RECORDED_INFO[0], volume=0.5),
+        fade_frames=frames,
+        outgoing=YTDLSource(FakePCMAudio(frames=frames), data=RECORDED_INFO[1], volume=0.5)
+    )
+    return {
+        'ytdl_source_read': time_calls(source.read, frames),
+        'crossfade_passthrough_read': time_calls(passthrough.read, frames),
+        'crossfade_mixing_read': time_calls(fading.read, frames - 1)
+    }
+
+
+async def bench_add_to_queue(bot, count=500):
+    """Throughput of MusicPlayer.add_to_queue with the fake extractor."""
+    guild = FakeGuild(1000 << 22)
+    music_player = bot.get_music_player(guild.id)
+    attach_voice(music_player, guild)
+    requester = FakeMember(2)
+
+    started = time.perf_counter()
+    stats = await time_async_calls(lambda: music_player.add_to_queue("never gonna give you up", requester), count)
+    elapsed = time.perf_counter() - started
+    stats['ops_per_second'] = round(count / elapsed, 1)
+    music_player.queue.clear()
+    return {'add_to_queue': stats}
+
+
+async def bench_play_next(bot, count=300):
+    """Transition latency of MusicPlayer.play_next with a resolved queue."""
+    guild = FakeGuild(2000 << 22)
+    music_player = bot.get_music_player(guild.id)
+    attach_voice(music_player, guild)
+    requester = FakeMember(3)
+    for index in range(count + 1):
+        music_player.queue.add(make_song(index, requester))
+
+    async def transition():
+        await music_player.play_next()
+        # The stream opens outside the mailbox; wait until the song is playing
+        if music_player.opening:
+            await music_player.opening
+
+    stats = await time_async_calls(transition, count)
+    music_player.queue.clear()
+    return {'play_next': stats}
+
+
+class FakePanelMessage:
+    def __init__(self, bot, guild):
+        self.author = bot.user
+        self.guild = guild
+        self.id = 1
+        embed = discord.Embed(title="[ No Song Playing ]")
+        embed.set_footer(text="Music Control Panel • Use buttons below to control playback")
+        self.embeds = [embed]
+
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id, message):
+        self.id = channel_id
+        self.message = message
+
+    async def history(self, limit=None):
+        yield self.message
+
+    def get_partial_message(self, message_id):
+        return self.message
+
+
+async def bench_panel_render(bot, count=200):
+    """Cost of building and syncing a setup panel."""
+    guild = FakeGuild(3000 << 22)
+    music_player = bot.get_music_player(guild.id)
+    attach_voice(music_player, guild)
+    await music_player.add_to_queue("bohemian rhapsody", FakeMember(4))
+
+    channel = FakeTextChannel(guild.id + 10, FakePanelMessage(bot, guild))
+    guild.channels.append(channel)
+    bot._connection._guilds[guild.id] = guild
+    view = SetupControlView(bot, channel.id, guild.id, message_id=channel.message.id)
+
+    try:
+        return {
+            'setup_view_init': await time_async_calls(lambda: _build_view(bot, channel.id, guild.id), count),
+            'panel_sync': await time_async_calls(view.sync_panel, count)
+        }
+    finally:
+        del bot._connection._guilds[guild.id]
+
+
+async def bench_setup_view_at_scale(bot, guilds=5000, channels_per_guild=10, count=200):
+    """Cost of building and syncing a setup panel when the bot is in thousands of guilds."""
+    fake_guilds = [FakeGuild((4000 + index) << 22) for index in range(guilds)]
+    for guild in fake_guilds:
+        guild.channels.extend(
+            FakeTextChannel(guild.id + 10 + index, None) for index in range(channels_per_guild - 1)
+        )
+        bot._connection._guilds[guild.id] = guild
+
+    # The panel lives in the last guild, the worst case for a scan over all guilds
+    guild = fake_guilds[-1]
+    channel = guild.channels[-1]
+    channel.message = FakePanelMessage(bot, guild)
+    view = SetupControlView(bot, channel.id, guild.id, message_id=channel.message.id)
+
+    try:
+        return {
+            f'setup_view_init_{guilds // 1000}k_guilds': await time_async_calls(
+                lambda: _build_view(bot, channel.id, guild.id), count
+            ),
+            f'panel_sync_{guilds // 1000}k_guilds': await time_async_calls(view.sync_panel, count)
+        }
+    finally:
+        for fake_guild in fake_guilds:
+            del bot._connection._guilds[fake_guild.id]
+        if guild.id in bot.music_players:
+            del bot.music_players[guild.id]
+
+
+async def _build_view(bot, channel_id, guild_id):
+    SetupControlView(bot, channel_id, guild_id)
+
+
+async def run_async_benchmarks():
+    results = {}
+    async with MusicBot() as bot:
+        results.update(await bench_add_to_queue(bot))
+        results.update(await bench_play_next(bot))
+        results.update(await bench_panel_render(bot))
+        results.update(await bench_setup_view_at_scale(bot))
+        for music_player in list(bot.music_players.values()):
+            music_player.queue.clear()
+            music_player.voice_client = None
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    """Print mean-time changes against an earlier results file."""
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+
+    def flatten(results, prefix=""):
+        for name, value in results.items():
+            if isinstance(value, dict) and 'mean_us' in value:
+                yield prefix + name, value['mean_us']
+            elif isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{name}.")
+
+    before = dict(flatten(baseline['results']))
+    print(f"Comparing against {baseline.get('revision')}:")
+    for name, mean_us in flatten(current['results']):
+        if name in before and before[name]:
+            change = (mean_us - before[name]) / before[name] * 100
+            print(f"  {name:45s} {before[name]:>12.3f}us -> {mean_us:>12.3f}us ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline playback benchmarks")
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the JSON results")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with patch_media():
+        results = {}
+        results.update(bench_queue_manager())
+        results.update(bench_audio_source())
+        results.update(asyncio.run(run_async_benchmarks()))
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import asyncio
+import audioop
+import json
+import logging
+import multiprocessing
+import shlex
+import socket
+import socketserver
+import struct
+import subprocess
+import threading
+import discord
+from config import Config
+from .startup import load_opus
+
+# Frame header: kind (1 byte), generation (2 bytes), payload length (2 bytes)
+HEADER = struct.Struct('>BHH')
+FRAME_AUDIO = 1
+FRAME_EVENT = 2
+
+PCM_FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+SAMPLES_PER_FRAME = discord.opus.Encoder.SAMPLES_PER_FRAME
+
+
+def build_ffmpeg_args(stream_url, before_options, options, position=0.0):
+    """Build the ffmpeg command line for a PCM stream, optionally seeking."""
+    args = ['ffmpeg']
+    if position:
+        args += ['-ss', f"{position:.2f}"]
+    args += shlex.split(before_options or '')
+    args += ['-i', stream_url, '-f', 's16le', '-ar', '48000', '-ac', '2', '-loglevel', 'warning']
+    args += shlex.split(options or '')
+    args.append('pipe:1')
+    return args
+
+
+class AudioStreamHandler(socketserver.StreamRequestHandler):
+    """Runs one ffmpeg pipeline inside a worker and streams Opus packets back."""
+
+    def setup(self):
+        super().setup()
+        self.send_lock = threading.Lock()
+        self.process = None
+        self.generation = 0
+        self.volume = 1.0
+        self.resumed = threading.Event()
+        self.resumed.set()
+        self.stopped = False
+        self.pipeline_lock = threading.Lock()
+
+    def send_frame(self, kind, generation, payload):
+        with self.send_lock:
+            self.wfile.write(HEADER.pack(kind, generation, len(payload)) + payload)
+            self.wfile.flush()
+
+    def send_event(self, generation, event, **fields):
+        fields['event'] = event
+        self.send_frame(FRAME_EVENT, generation, json.dumps(fields).encode())
+
+    def handle(self):
+        """Read control commands; the first one must be ``play``."""
+        for line in self.rfile:
+            try:
+                command = json.loads(line)
+            except ValueError:
+                continue
+            cmd = command.get('cmd')
+            if cmd == 'play':
+                self.request_info = command
+                self.volume = command.get('volume', 1.0)
+                self.encoder = discord.opus.Encoder(bitrate=command.get('bitrate', 128))
+                self.start_pipeline(command.get('position', 0.0), 0)
+            elif cmd == 'volume':
+                self.volume = command['volume']
+            elif cmd == 'seek':
+                self.start_pipeline(command['position'], command['generation'])
+            elif cmd == 'pause':
+                self.resumed.clear()
+            elif cmd == 'resume':
+                self.resumed.set()
+            elif cmd == 'stop':
+                break
+        self.stopped = True
+        self.resumed.set()
+        self.kill_process()
+
+    def start_pipeline(self, position, generation):
+        """(Re)start ffmpeg at a position and stream it under a new generation."""
+        with self.pipeline_lock:
+            self.kill_process()
+            self.generation = generation
+            self.process = subprocess.Popen(
+                build_ffmpeg_args(
+                    self.request_info['url'],
+                    self.request_info.get('before_options'),
+                    self.request_info.get('options'),
+                    position
+                ),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            threading.Thread(
+                target=self.pump, args=(self.process, generation), daemon=True,
+                name=f"audio-pump:pid-{self.process.pid}"
+            ).start()
+
+    def pump(self, process, generation):
+        """Read PCM from ffmpeg, apply volume, encode and send Opus packets."""
+        try:
+            while True:
+                self.resumed.wait()
+                if self.stopped or generation != self.generation:
+                    return  # Stopped, or replaced by a seek
+                pcm = process.stdout.read(PCM_FRAME_SIZE)
+                if len(pcm) != PCM_FRAME_SIZE:
+                    break
+                if self.volume != 1.0:
+                    pcm = audioop.mul(pcm, 2, min(self.volume, 2.0))
+                packet = self.encoder.encode(pcm, SAMPLES_PER_FRAME)
+                self.send_frame(FRAME_AUDIO, generation, packet)
+
+            # ffmpeg finished (or died) for this generation
+            process.wait()
+            if process.returncode:
+                stderr = process.stderr.read(2048).decode(errors='ignore')
+                self.send_event(generation, 'error', code=process.returncode, stderr=stderr)
+            else:
+                self.send_event(generation, 'end')
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            self.stopped = True
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+    def kill_process(self):
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+
+
+class AudioWorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def run_worker(worker_id, ports):
+    """Entry point of an audio worker process."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - audio worker {worker_id} - %(name)s - %(levelname)s - %(message)s'
+    )
+    load_opus()
+    server = AudioWorkerServer(('127.0.0.1', 0), AudioStreamHandler)
+    ports.put((worker_id, server.server_address[1]))
+    server.serve_forever()
+
+
+class RemoteAudioSource(discord.AudioSource):
+    """Audio source whose ffmpeg pipeline and Opus encoding run in an audio worker."""
+
+    def __init__(self, pool, worker_id, stream_url, *, data, volume=0.5, bitrate=128, position=0.0):
+        self.pool = pool
+        self.worker_id = worker_id
+        self.data = data
+        self.title = data.get('title')
+        self.url = data.get('url')
+        self.duration = data.get('duration')
+        self.uploader = data.get('uploader')
+        self.frames = int(position * 50)
+        self.on_first_frame = None  # Called from the player thread on the first frame
+        self._volume = volume
+        self._gain = 1.0
+        self.eof = False  # The worker's pipeline ended (as opposed to the player being stopped)
+        self.stalled = False  # Cut by the stream watchdog
+        self.last_error = None  # ffmpeg stderr reported by the worker
+        self._generation = 0
+        self._send_lock = threading.Lock()
+        self._closed = False
+
+        self._sock = socket.create_connection(pool.addresses[worker_id])
+        self._reader = self._sock.makefile('rb')
+        self._send(
+            cmd='play',
+            url=stream_url,
+            before_options=Config.FFMPEG_OPTIONS['before_options'],
+            options=Config.FFMPEG_OPTIONS['options'],
+            volume=volume,
+            bitrate=bitrate,
+            position=position
+        )
+
+    def _send(self, **command):
+        with self._send_lock:
+            if not self._closed:
+                self._sock.sendall(json.dumps(command).encode() + b"\n")
+
+    def is_opus(self):
+        return True
+
+    def read(self):
+        """Return the next Opus packet for the current generation."""
+        while True:
+            header = self._reader.read(HEADER.size)
+            if len(header) < HEADER.size:
+                self.eof = True
+                return b''
+            kind, generation, length = HEADER.unpack(header)
+            payload = self._reader.read(length)
+            if generation != self._generation:
+                continue  # Stale frame from before a seek
+            if kind == FRAME_AUDIO:
+                self.frames += 1
+                if self.on_first_frame:
+                    self.on_first_frame()
+                    self.on_first_frame = None
+                return payload
+
+            event = json.loads(payload)
+            if event['event'] == 'error':
+                self.last_error = event.get('stderr')
+                logging.error(f"Audio worker {self.worker_id} ffmpeg error: {self.last_error}")
+            self.eof = True
+            return b''
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(value, 0.0)
+        self._send(cmd='volume', volume=self._volume * self._gain)
+
+    @property
+    def gain(self):
+        return self._gain
+
+    @gain.setter
+    def gain(self, value):
+        self._gain = value
+        self._send(cmd='volume', volume=self._volume * self._gain)
+
+    def seek(self, position):
+        """Restart the worker pipeline at a position in seconds."""
+        self._generation = (self._generation + 1) % 65536
+        self.frames = int(position * 50)
+        self._send(cmd='seek', position=position, generation=self._generation)
+
+    def pause(self):
+        self._send(cmd='pause')
+
+    def resume(self):
+        self._send(cmd='resume')
+
+    def cleanup(self):
+        if self._closed:
+            return
+        try:
+            self._send(cmd='stop')
+        except OSError:
+            pass
+        self._closed = True
+        try:
+            # Unblocks a player thread waiting in read()
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        self.pool.release(self.worker_id)
+
+
+class AudioWorkerPool:
+    """Pool of audio worker processes that own ffmpeg pipelines and Opus encoding."""
+
+    def __init__(self, size):
+        self.size = size
+        self.logger = logging.getLogger(__name__)
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = {}  # worker_id -> Process
+        self.addresses = {}  # worker_id -> (host, port)
+        self.active_streams = {}  # worker_id -> number of open streams
+        self._ports = self.context.Queue()
+        self._lock = threading.Lock()  # Streams are opened from executor threads
+
+    def start(self):
+        """Spawn every worker and wait for them to report their ports."""
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        self._collect_ports(self.size)
+        self.logger.info(f"Started {self.size} audio workers")
+
+    def _spawn(self, worker_id):
+        process = self.context.Process(
+            target=run_worker, args=(worker_id, self._ports),
+            name=f"konoha-audio-{worker_id}", daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.active_streams[worker_id] = 0
+
+    def _collect_ports(self, count):
+        for _ in range(count):
+            worker_id, port = self._ports.get(timeout=30)
+            self.addresses[worker_id] = ('127.0.0.1', port)
+
+    def ensure_alive(self):
+        """Restart workers that have exited (blocking while they start)."""
+        dead = [worker_id for worker_id, process in list(self.processes.items()) if not process.is_alive()]
+        for worker_id in dead:
+            self.logger.warning(f"Audio worker {worker_id} exited, restarting")
+            # Keep new streams away until the replacement reports its port
+            self.addresses.pop(worker_id, None)
+            self._spawn(worker_id)
+        if dead:
+            self._collect_ports(len(dead))
+
+    async def supervise(self):
+        """Periodically restart exited workers without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        while self.processes:
+            await asyncio.sleep(Config.AUDIO_WORKER_CHECK_INTERVAL)
+            try:
+                await loop.run_in_executor(None, self.ensure_alive)
+            except Exception as e:
+                self.logger.error(f"Failed to restart audio workers: {e}")
+
+    def acquire(self):
+        """Pick the least loaded running worker for a new stream."""
+        with self._lock:
+            running = [
+                worker_id for worker_id, process in list(self.processes.items())
+                if worker_id in self.addresses and process.is_alive()
+            ]
+            if not running:
+                raise RuntimeError("No audio workers are running")
+            worker_id = min(running, key=self.active_streams.get)
+            self.active_streams[worker_id] += 1
+            return worker_id
+
+    def release(self, worker_id):
+        with self._lock:
+            if self.active_streams.get(worker_id, 0) > 0:
+                self.active_streams[worker_id] -= 1
+
+    def create_source(self, stream_url, *, data, volume=0.5, bitrate=128, position=0.0):
+        """Open a stream on the least loaded worker."""
+        worker_id = self.acquire()
+        try:
+            return RemoteAudioSource(
+                self, worker_id, stream_url,
+                data=data, volume=volume, bitrate=bitrate, position=position
+            )
+        except Exception:
+            self.release(worker_id)
+            raise
+
+    def stop(self):
+        """Terminate every worker."""
+        for process in self.processes.values():
+            process.terminate()
+        self.processes.clear()
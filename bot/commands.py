@@ -2,9 +2,17 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import logging
-from .utils import format_duration
+import tracemalloc
+from .utils import format_duration, parse_timestamp
+from .memory_stats import memory_report
+from .metrics import REST_EDITS, labels_for
+from .tracing import trace
+from config import Config
 import asyncio
 
+# Queue info shown for guilds without a music player
+IDLE_QUEUE_INFO = {'current': None, 'queue': [], 'is_playing': False, 'is_paused': False, 'loop_mode': 'off'}
+
 class MusicCommands(commands.Cog):
     """Music commands for the Discord bot."""
 
@@ -15,62 +23,71 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="play", description="Play a song or add it to queue")
     async def play_slash(self, interaction: discord.Interaction, query: str):
         """Play command via slash command."""
-        await interaction.response.defer()
-
-        # Check if user is in voice channel
-        if not interaction.user.voice:
-            await interaction.followup.send("❌ You need to be in a voice channel to use this command!")
-            return
-
-        voice_channel = interaction.user.voice.channel
-        music_player = self.bot.get_music_player(interaction.guild.id)
-
-        # Connect to voice channel
-        if not await music_player.connect(voice_channel):
-            await interaction.followup.send("❌ Failed to connect to voice channel!")
-            return
-
-        # Add to queue
-        song_info = await music_player.add_to_queue(query, interaction.user)
-        if song_info:
-            platform_emoji = {
-                'youtube': '🎥',
-                'spotify': '🎵',
-                'soundcloud': '🔊'
-            }.get(song_info.get('platform', 'youtube'), '🎵')
-
-            embed = discord.Embed(
-                title=f"{platform_emoji} Added to Queue",
-                description=f"**[{song_info['title']}]({song_info.get('url', '')})**\nRequested by {interaction.user.mention}",
-                color=discord.Color.green()
-            )
-            if song_info.get('duration'):
-                embed.add_field(name="⏱️ Duration", value=format_duration(song_info['duration']), inline=True)
-            if song_info.get('uploader'):
-                embed.add_field(name="👤 Author", value=song_info['uploader'], inline=True)
-            embed.add_field(name="🔗 Source", value=song_info.get('platform', 'youtube').title(), inline=True)
-            if song_info.get('url'):
-                embed.add_field(name="🎵 Watch", value=f"[Link]({song_info['url']})", inline=True)
-            if song_info.get('thumbnail'):
-                embed.set_thumbnail(url=song_info['thumbnail'])
-
-            # Sync panels immediately
-            await music_player.sync_setup_panels()
+        with trace('play', guild_id=interaction.guild.id, source='slash', query=query):
+            await interaction.response.defer()
+
+            # Check if user is in voice channel
+            if not interaction.user.voice:
+                await interaction.followup.send("❌ You need to be in a voice channel to use this command!")
+                return
+
+            voice_channel = interaction.user.voice.channel
+            music_player = self.bot.get_music_player(interaction.guild.id)
+
+            # Connect to voice channel
+            if not await music_player.connect(voice_channel):
+                await interaction.followup.send("❌ Failed to connect to voice channel!")
+                return
+
+            # Add to queue
+            song_info = await music_player.add_to_queue(query, interaction.user)
+            if song_info:
+                platform_emoji = {
+                    'youtube': '🎥',
+                    'spotify': '🎵',
+                    'soundcloud': '🔊'
+                }.get(song_info.get('platform', 'youtube'), '🎵')
+
+                embed = discord.Embed(
+                    title=f"{platform_emoji} Added to Queue",
+                    description=f"**[{song_info['title']}]({song_info.get('url', '')})**\nRequested by {interaction.user.mention}",
+                    color=discord.Color.green()
+                )
+                if song_info.get('duration'):
+                    embed.add_field(name="⏱️ Duration", value=format_duration(song_info['duration']), inline=True)
+                if song_info.get('uploader'):
+                    embed.add_field(name="👤 Author", value=song_info['uploader'], inline=True)
+                embed.add_field(name="🔗 Source", value=song_info.get('platform', 'youtube').title(), inline=True)
+                if song_info.get('url'):
+                    embed.add_field(name="🎵 Watch", value=f"[Link]({song_info['url']})", inline=True)
+                if song_info.get('thumbnail'):
+                    embed.set_thumbnail(url=song_info['thumbnail'])
+
+                # Sync panels immediately
+                await music_player.sync_setup_panels()
+
+                await interaction.followup.send(embed=embed)
+            else:
+                await interaction.followup.send("❌ Failed to find or add the song to queue!")
 
-            await interaction.followup.send(embed=embed)
-        else:
-            await interaction.followup.send("❌ Failed to find or add the song to queue!")
+    @play_slash.autocomplete('query')
+    async def play_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Suggest songs the bot has already resolved, without any network calls."""
+        return [
+            app_commands.Choice(name=entry['title'][:100], value=self.bot.title_index.choice_value(entry))
+            for entry in self.bot.title_index.search(current, limit=Config.AUTOCOMPLETE_LIMIT)
+        ]
 
     @app_commands.command(name="pause", description="Pause the current song")
     async def pause_slash(self, interaction: discord.Interaction):
         """Pause command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await interaction.response.send_message("❌ Nothing is currently playing!")
             return
 
-        music_player.pause()
+        await music_player.execute(music_player.pause)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await interaction.response.send_message("⏸️ Paused the current song")
@@ -78,13 +95,13 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="resume", description="Resume the paused song")
     async def resume_slash(self, interaction: discord.Interaction):
         """Resume command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.is_paused:
+        if not music_player or not music_player.is_paused:
             await interaction.response.send_message("❌ Nothing is currently paused!")
             return
 
-        music_player.resume()
+        await music_player.execute(music_player.resume)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await interaction.response.send_message("▶️ Resumed the song")
@@ -92,13 +109,13 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="skip", description="Skip the current song")
     async def skip_slash(self, interaction: discord.Interaction):
         """Skip command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await interaction.response.send_message("❌ Nothing is currently playing!")
             return
 
-        music_player.skip()
+        await music_player.execute(music_player.skip)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await interaction.response.send_message("⏭️ Skipped the current song")
@@ -106,12 +123,12 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="stop", description="Stop playing and clear the queue")
     async def stop_slash(self, interaction: discord.Interaction):
         """Stop command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        music_player.stop()
-        music_player.clear_queue()
-        # Sync panels immediately
-        await music_player.sync_setup_panels()
+        if music_player:
+            await music_player.execute(music_player.stop_and_clear)
+            # Sync panels immediately
+            await music_player.sync_setup_panels()
         await interaction.response.send_message("⏹️ Stopped playing and cleared the queue")
 
     @app_commands.command(name="loop", description="Set loop mode")
@@ -126,7 +143,7 @@ class MusicCommands(commands.Cog):
         music_player = self.bot.get_music_player(interaction.guild.id)
 
         if mode:
-            music_player.set_loop_mode(mode)
+            await music_player.execute(music_player.set_loop_mode, mode)
             # Sync panels immediately
             await music_player.sync_setup_panels()
             if mode == "off":
@@ -137,7 +154,7 @@ class MusicCommands(commands.Cog):
                 await interaction.response.send_message("🔁 Loop queue enabled")
         else:
             # If no mode specified, toggle between off and queue
-            loop_status = music_player.toggle_loop()
+            loop_status = await music_player.execute(music_player.toggle_loop)
             # Sync panels immediately
             await music_player.sync_setup_panels()
             status_text = "enabled" if loop_status else "disabled"
@@ -146,8 +163,8 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="queue", description="Show the current queue")
     async def queue_slash(self, interaction: discord.Interaction):
         """Queue command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
-        queue_info = music_player.get_queue_info()
+        music_player = self.bot.peek_music_player(interaction.guild.id)
+        queue_info = music_player.get_queue_info() if music_player else IDLE_QUEUE_INFO
 
         embed = discord.Embed(title="🎵 Current Queue", color=discord.Color.blue())
 
@@ -200,24 +217,24 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="disconnect", description="Disconnect the bot from voice channel")
     async def disconnect_slash(self, interaction: discord.Interaction):
         """Disconnect command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        await music_player.cleanup()
-        if interaction.guild.id in self.bot.music_players:
-            del self.bot.music_players[interaction.guild.id]
+        if music_player:
+            await music_player.execute(music_player.cleanup)
+            music_player.detach()
 
         await interaction.response.send_message("👋 Disconnected from voice channel")
 
     @app_commands.command(name="shuffle", description="Shuffle the current queue")
     async def shuffle_slash(self, interaction: discord.Interaction):
         """Shuffle command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if music_player.queue.is_empty():
+        if not music_player or music_player.queue.is_empty():
             await interaction.response.send_message("❌ Queue is empty!")
             return
 
-        music_player.queue.shuffle()
+        await music_player.execute(music_player.queue.shuffle)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await interaction.response.send_message("🔀 Shuffled the queue!")
@@ -225,43 +242,45 @@ class MusicCommands(commands.Cog):
     @app_commands.command(name="rewind", description="Restart the current song")
     async def rewind_slash(self, interaction: discord.Interaction):
         """Rewind command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.current_song:
+        if not music_player or not music_player.current_song:
             await interaction.response.send_message("❌ No song is currently playing!")
             return
 
-        # Stop current song and replay it
-        if music_player.voice_client and music_player.voice_client.is_playing():
-            music_player.voice_client.stop()
-
-        # Add current song to front of queue
-        music_player.queue.add_to_front(music_player.current_song)
+        # Restart the current song from the beginning
+        await music_player.execute(music_player.rewind)
 
         await interaction.response.send_message("⏪ Rewinding current song!")
 
-    @app_commands.command(name="previous", description="Go back to previous song")
-    async def previous_slash(self, interaction: discord.Interaction):
-        """Previous command via slash command."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+    @app_commands.command(name="seek", description="Jump to a position in the current song")
+    @app_commands.describe(position="Position like 1:30 or 90 (seconds)")
+    async def seek_slash(self, interaction: discord.Interaction, position: str):
+        """Seek command via slash command."""
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not hasattr(music_player, 'previous_songs') or not music_player.previous_songs:
-            await interaction.response.send_message("❌ No previous songs available!")
+        if not music_player or not music_player.current_song:
+            await interaction.response.send_message("❌ No song is currently playing!")
             return
 
-        # Get previous song
-        prev_song = music_player.previous_songs.pop()
+        seconds = parse_timestamp(position)
+        if seconds is None:
+            await interaction.response.send_message("❌ Use a position like `1:30` or `90`!")
+            return
 
-        # Stop current song
-        if music_player.voice_client and music_player.voice_client.is_playing():
-            music_player.voice_client.stop()
+        if not await music_player.execute(music_player.seek, seconds):
+            await interaction.response.send_message("❌ Seeking isn't supported for this song!")
+            return
+        await interaction.response.send_message(f"⏩ Jumped to {format_duration(int(seconds))}")
 
-        # Add current song back to queue if it exists
-        if music_player.current_song:
-            music_player.queue.add_to_front(music_player.current_song)
+    @app_commands.command(name="previous", description="Go back to previous song")
+    async def previous_slash(self, interaction: discord.Interaction):
+        """Previous command via slash command."""
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        # Add previous song to front of queue
-        music_player.queue.add_to_front(prev_song)
+        if not music_player or not await music_player.execute(music_player.previous):
+            await interaction.response.send_message("❌ No previous songs available!")
+            return
 
         await interaction.response.send_message("⏮️ Playing previous song!")
 
@@ -273,17 +292,156 @@ class MusicCommands(commands.Cog):
             return
 
         music_player = self.bot.get_music_player(interaction.guild.id)
-        music_player.set_volume(volume / 100.0)  # Convert to 0.0-1.0 range
+        await music_player.execute(music_player.set_volume, volume / 100.0)  # Convert to 0.0-1.0 range
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await interaction.response.send_message(f"🔊 Volume set to {volume}%")
 
+    @app_commands.command(name="normalize", description="Even out loudness between songs")
+    @app_commands.describe(mode="Turn loudness normalization on or off")
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="On", value="on"),
+        app_commands.Choice(name="Off", value="off")
+    ])
+    async def normalize_slash(self, interaction: discord.Interaction, mode: str):
+        """Normalize command via slash command."""
+        music_player = self.bot.get_music_player(interaction.guild.id)
+        await music_player.execute(music_player.set_normalize, mode == "on")
+        if mode == "on":
+            await interaction.response.send_message(
+                "🎚️ Loudness normalization enabled (new songs are measured the first time they play)"
+            )
+        else:
+            await interaction.response.send_message("🎚️ Loudness normalization disabled")
+
     @app_commands.command(name="ping", description="Check bot latency")
     async def ping_slash(self, interaction: discord.Interaction):
         """Ping command via slash command."""
         latency = round(self.bot.latency * 1000)
         await interaction.response.send_message(f"🏓 Pong! Latency: {latency}ms")
 
+    @app_commands.command(name="loopstats", description="Show event loop lag and recent stalls (admin)")
+    async def loopstats_slash(self, interaction: discord.Interaction):
+        """Loop stats command via slash command."""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ You need administrator permission!", ephemeral=True)
+            return
+
+        monitor = self.bot.loop_monitor
+        if not monitor:
+            await interaction.response.send_message("❌ Event loop monitor is disabled!", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="🩺 Event Loop Health", color=discord.Color.blue())
+        lag = monitor.percentiles()
+        embed.add_field(
+            name="Scheduling Lag",
+            value=(
+                f"p50: {lag['p50']}ms • p95: {lag['p95']}ms\n"
+                f"p99: {lag['p99']}ms • max: {lag['max']}ms"
+            ) if lag else "No samples yet",
+            inline=False
+        )
+
+        if monitor.stalls:
+            for stall in list(monitor.stalls)[-3:]:
+                stack = stall['stack'][-900:]
+                embed.add_field(
+                    name=f"Stall at {stall['time']} - {stall['duration']}s",
+                    value=f"```{stack}```",
+                    inline=False
+                )
+        else:
+            embed.add_field(name="Stalls", value="No stalls recorded", inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="memory", description="Show memory use per guild and tracemalloc diffs (owner)")
+    @app_commands.describe(action="Show estimates, or start, snapshot or stop tracemalloc")
+    @app_commands.choices(action=[
+        app_commands.Choice(name="Summary", value="summary"),
+        app_commands.Choice(name="Start tracing", value="start"),
+        app_commands.Choice(name="Snapshot diff", value="snapshot"),
+        app_commands.Choice(name="Stop tracing", value="stop")
+    ])
+    async def memory_slash(self, interaction: discord.Interaction, action: str = "summary"):
+        """Memory command via slash command."""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ Only the bot owner can use this command!", ephemeral=True)
+            return
+
+        profiler = self.bot.memory_profiler
+        loop = asyncio.get_running_loop()
+
+        if action == "start":
+            await interaction.response.defer(ephemeral=True)
+            await loop.run_in_executor(None, profiler.start)
+            await interaction.followup.send(
+                f"🧪 tracemalloc started ({profiler.frames} frames) - baseline snapshot taken", ephemeral=True
+            )
+            return
+
+        if action == "stop":
+            if not profiler.tracing:
+                await interaction.response.send_message("❌ tracemalloc is not running!", ephemeral=True)
+                return
+            profiler.stop()
+            await interaction.response.send_message("🧪 tracemalloc stopped", ephemeral=True)
+            return
+
+        if action == "snapshot":
+            if not profiler.tracing:
+                await interaction.response.send_message("❌ Start tracing first with `/memory start`!", ephemeral=True)
+                return
+            await interaction.response.defer(ephemeral=True)
+            diff = await loop.run_in_executor(None, profiler.snapshot)
+            lines = []
+            for stat in diff:
+                frame = stat.traceback[0]
+                filename = frame.filename.rsplit('/', 1)[-1]
+                lines.append(f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d}) {filename}:{frame.lineno}")
+            report = "\n".join(lines)[:4000]
+            embed = discord.Embed(title=f"🧪 Allocation Growth (snapshot {profiler.snapshots})", color=discord.Color.blue())
+            embed.description = f"```{report}```" if lines else "No change since the last snapshot"
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
+        guilds, shared = memory_report(self.bot)
+        totals = {}
+        for sizes in guilds.values():
+            for structure, size in sizes.items():
+                totals[structure] = totals.get(structure, 0) + size
+
+        embed = discord.Embed(title="🧠 Memory Use (estimated)", color=discord.Color.blue())
+        embed.add_field(
+            name=f"Players ({len(guilds)})",
+            value="\n".join(
+                f"{structure}: {size / 1024:.1f} KiB" for structure, size in sorted(totals.items(), key=lambda item: -item[1])
+            ) or "No players",
+            inline=True
+        )
+        embed.add_field(
+            name="Shared",
+            value="\n".join(f"{structure}: {size / 1024:.1f} KiB" for structure, size in shared.items()),
+            inline=True
+        )
+        top = sorted(guilds.items(), key=lambda item: -sum(item[1].values()))[:Config.MEMORY_TOP_GUILDS]
+        if top:
+            embed.add_field(
+                name="Top Guilds",
+                value="\n".join(f"{guild_id}: {sum(sizes.values()) / 1024:.1f} KiB" for guild_id, sizes in top),
+                inline=False
+            )
+        if profiler.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            embed.add_field(
+                name="tracemalloc",
+                value=f"{current / 1048576:.1f} MiB traced • peak {peak / 1048576:.1f} MiB",
+                inline=False
+            )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="commands", description="Display all available bot commands")
     async def commands_slash(self, interaction: discord.Interaction):
         """Commands command via slash command."""
@@ -306,8 +464,10 @@ class MusicCommands(commands.Cog):
                 "`/queue` - Show the current queue\n"
                 "`/shuffle` - Shuffle the current queue\n"
                 "`/rewind` - Restart the current song\n"
+                "`/seek <position>` - Jump to a position in the current song\n"
                 "`/previous` - Go back to previous song\n"
-                "`/volume <0-100>` - Set the volume"
+                "`/volume <0-100>` - Set the volume\n"
+                "`/normalize` - Even out loudness between songs"
             ),
             inline=False
         )
@@ -320,6 +480,8 @@ class MusicCommands(commands.Cog):
                 "`/clear <amount>` - Clear messages from channel\n"
                 "`/ping` - Check bot latency\n"
                 "`/setup` - Setup music control panel\n"
+                "`/loopstats` - Show event loop health (admin)\n"
+                "`/memory` - Show memory use and allocation diffs (owner)\n"
                 "`/commands` - Display this help message"
             ),
             inline=False
@@ -357,10 +519,10 @@ class MusicCommands(commands.Cog):
         await asyncio.sleep(3)
 
         # Get music player info
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
         # Create the main embed for current song
-        if music_player.current_song:
+        if music_player and music_player.current_song:
             current = music_player.current_song
             platform_emoji = {
                 'youtube': '🎥',
@@ -447,14 +609,19 @@ class MusicCommands(commands.Cog):
         self.bot.setup_channels[interaction.guild.id] = interaction.channel.id
 
         # Send the embed with control buttons to the channel
-        view = SetupControlView(self.bot, interaction.channel.id)
+        view = SetupControlView(self.bot, interaction.channel.id, interaction.guild.id)
         message = await interaction.channel.send(
             embed=embed,
             view=view
         )
+        view.message_id = message.id
 
-        # Register the panel for auto-sync
-        music_player.register_setup_panel(view)
+        # Remember the panel so it keeps working after a restart
+        await self.bot.save_setup_panel(view)
+
+        # Register the panel for auto-sync (a player created later picks it up from setup_views)
+        if music_player:
+            music_player.register_setup_panel(view)
 
     # Text-based commands for backward compatibility
     @commands.command(name="play", aliases=['p'])
@@ -482,13 +649,13 @@ class MusicCommands(commands.Cog):
     @commands.command(name="pause")
     async def pause_text(self, ctx):
         """Pause command via text."""
-        music_player = self.bot.get_music_player(ctx.guild.id)
+        music_player = self.bot.peek_music_player(ctx.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await ctx.send("❌ Nothing is currently playing!")
             return
 
-        music_player.pause()
+        await music_player.execute(music_player.pause)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await ctx.send("⏸️ Paused the current song")
@@ -496,13 +663,13 @@ class MusicCommands(commands.Cog):
     @commands.command(name="resume")
     async def resume_text(self, ctx):
         """Resume command via text."""
-        music_player = self.bot.get_music_player(ctx.guild.id)
+        music_player = self.bot.peek_music_player(ctx.guild.id)
 
-        if not music_player.is_paused:
+        if not music_player or not music_player.is_paused:
             await ctx.send("❌ Nothing is currently paused!")
             return
 
-        music_player.resume()
+        await music_player.execute(music_player.resume)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await ctx.send("▶️ Resumed the song")
@@ -510,13 +677,13 @@ class MusicCommands(commands.Cog):
     @commands.command(name="skip", aliases=['s'])
     async def skip_text(self, ctx):
         """Skip command via text."""
-        music_player = self.bot.get_music_player(ctx.guild.id)
+        music_player = self.bot.peek_music_player(ctx.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await ctx.send("❌ Nothing is currently playing!")
             return
 
-        music_player.skip()
+        await music_player.execute(music_player.skip)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         await ctx.send("⏭️ Skipped the current song")
@@ -524,12 +691,12 @@ class MusicCommands(commands.Cog):
     @commands.command(name="stop")
     async def stop_text(self, ctx):
         """Stop command via text."""
-        music_player = self.bot.get_music_player(ctx.guild.id)
+        music_player = self.bot.peek_music_player(ctx.guild.id)
 
-        music_player.stop()
-        music_player.clear_queue()
-        # Sync panels immediately
-        await music_player.sync_setup_panels()
+        if music_player:
+            await music_player.execute(music_player.stop_and_clear)
+            # Sync panels immediately
+            await music_player.sync_setup_panels()
         await ctx.send("⏹️ Stopped playing and cleared the queue")
 
     @commands.command(name="loop")
@@ -537,7 +704,7 @@ class MusicCommands(commands.Cog):
         """Loop command via text."""
         music_player = self.bot.get_music_player(ctx.guild.id)
 
-        loop_status = music_player.toggle_loop()
+        loop_status = await music_player.execute(music_player.toggle_loop)
         # Sync panels immediately
         await music_player.sync_setup_panels()
         status_text = "enabled" if loop_status else "disabled"
@@ -546,8 +713,8 @@ class MusicCommands(commands.Cog):
     @commands.command(name="queue", aliases=['q'])
     async def queue_text(self, ctx):
         """Queue command via text."""
-        music_player = self.bot.get_music_player(ctx.guild.id)
-        queue_info = music_player.get_queue_info()
+        music_player = self.bot.peek_music_player(ctx.guild.id)
+        queue_info = music_player.get_queue_info() if music_player else IDLE_QUEUE_INFO
 
         embed = discord.Embed(title="🎵 Current Queue", color=discord.Color.blue())
 
@@ -596,54 +763,45 @@ class MusicControlView(discord.ui.View):
     @discord.ui.button(label="Pause", style=discord.ButtonStyle.primary, emoji="⏸️")
     async def pause_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Pause button handler."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await interaction.response.send_message("❌ Nothing is currently playing!", ephemeral=True)
             return
 
-        music_player.pause()
+        await music_player.execute(music_player.pause)
         await interaction.response.send_message("⏸️ Paused the current song", ephemeral=True)
 
     @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="⏮️")
     async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Previous button handler."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not hasattr(music_player, 'previous_songs') or not music_player.previous_songs:
+        if not music_player or not await music_player.execute(music_player.previous):
             await interaction.response.send_message("❌ No previous songs available!", ephemeral=True)
             return
 
-        prev_song = music_player.previous_songs.pop()
-
-        if music_player.voice_client and music_player.voice_client.is_playing():
-            music_player.voice_client.stop()
-
-        if music_player.current_song:
-            music_player.queue.add_to_front(music_player.current_song)
-
-        music_player.queue.add_to_front(prev_song)
         await interaction.response.send_message("⏮️ Playing previous song!", ephemeral=True)
 
     @discord.ui.button(label="Skip", style=discord.ButtonStyle.secondary, emoji="⏭️")
     async def skip_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Skip button handler."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await interaction.response.send_message("❌ Nothing is currently playing!", ephemeral=True)
             return
 
-        music_player.skip()
+        await music_player.execute(music_player.skip)
         await interaction.response.send_message("⏭️ Skipped the current song", ephemeral=True)
 
     @discord.ui.button(label="Stop", style=discord.ButtonStyle.danger, emoji="⏹️")
     async def stop_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Stop button handler."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        music_player.stop()
-        music_player.clear_queue()
+        if music_player:
+            await music_player.execute(music_player.stop_and_clear)
         await interaction.response.send_message("⏹️ Stopped playing and cleared the queue", ephemeral=True)
 
     @discord.ui.button(label="Repair", style=discord.ButtonStyle.secondary, emoji="🔧")
@@ -657,13 +815,9 @@ class MusicControlView(discord.ui.View):
 
         music_player = self.bot.get_music_player(interaction.guild.id)
 
-        # Disconnect and reconnect
-        if music_player.voice_client:
-            await music_player.voice_client.disconnect()
-
-        # Reconnect to voice channel
+        # Reconnect to voice channel and resume where playback stopped
         voice_channel = interaction.user.voice.channel
-        if await music_player.connect(voice_channel):
+        if await music_player.reconnect(voice_channel):
             await interaction.followup.send("🔧 Repaired voice connection!", ephemeral=True)
         else:
             await interaction.followup.send("❌ Failed to repair voice connection!", ephemeral=True)
@@ -672,25 +826,17 @@ class MusicControlView(discord.ui.View):
 class SetupControlView(discord.ui.View):
     """Comprehensive music control panel for setup command."""
 
-    def __init__(self, bot, channel_id):
+    def __init__(self, bot, channel_id, guild_id, message_id=None):
         super().__init__(timeout=None)
         self.bot = bot
         self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.message_id = message_id  # Panel message, edited in place by sync_panel
         self.logger = logging.getLogger(__name__)
 
-        # Set initial button states
-        guild_id = None
-        for guild in bot.guilds:
-            for channel in guild.channels:
-                if channel.id == channel_id:
-                    guild_id = guild.id
-                    break
-            if guild_id:
-                break
-
-        if guild_id:
-            music_player = bot.get_music_player(guild_id)
-
+        # Set initial button states (views restored on startup have no player yet)
+        music_player = bot.music_players.get(guild_id) if guild_id else None
+        if music_player:
             # Set pause/resume button
             pause_button = [item for item in self.children if hasattr(item, 'label') and 'Pause' in item.label][0]
             if music_player.is_paused:
@@ -705,9 +851,10 @@ class SetupControlView(discord.ui.View):
 
     async def update_panel(self, interaction):
         """Update the control panel with current song info."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        # Rendering must not create a player for an idle guild
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if music_player.current_song:
+        if music_player and music_player.current_song:
             current = music_player.current_song
             platform_emoji = {
                 'youtube': '🎥',
@@ -787,6 +934,7 @@ class SetupControlView(discord.ui.View):
         embed.set_footer(text="Music Control Panel • Use buttons below to control playback")
 
         # Update the message
+        REST_EDITS.inc(kind='panel', **labels_for(self.bot, interaction.guild.id))
         try:
             await interaction.response.edit_message(embed=embed, view=self)
         except:
@@ -795,17 +943,17 @@ class SetupControlView(discord.ui.View):
             except:
                 await interaction.followup.edit_message(interaction.message.id, embed=embed, view=self)
 
-    @discord.ui.button(label="Pause", style=discord.ButtonStyle.primary, emoji="⏸️", row=0)
+    @discord.ui.button(label="Pause", style=discord.ButtonStyle.primary, emoji="⏸️", row=0, custom_id="konoha:setup:pause")
     async def pause_resume_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Toggle pause/resume button."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if music_player.is_paused:
-            music_player.resume()
+        if music_player and music_player.is_paused:
+            await music_player.execute(music_player.resume)
             button.label = "Pause"
             button.emoji = "⏸️"
-        elif music_player.is_playing:
-            music_player.pause()
+        elif music_player and music_player.is_playing:
+            await music_player.execute(music_player.pause)
             button.label = "Resume"
             button.emoji = "▶️"
         else:
@@ -816,52 +964,43 @@ class SetupControlView(discord.ui.View):
         self.update_button_states(music_player)
         await self.update_panel(interaction)
 
-    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="⏮️", row=0)
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="⏮️", row=0, custom_id="konoha:setup:previous")
     async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Previous song button."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not hasattr(music_player, 'previous_songs') or not music_player.previous_songs:
+        if not music_player or not await music_player.execute(music_player.previous):
             await interaction.response.send_message("❌ No previous songs available!", ephemeral=True, delete_after=3)
             return
 
-        prev_song = music_player.previous_songs.pop()
-
-        if music_player.voice_client and music_player.voice_client.is_playing():
-            music_player.voice_client.stop()
-
-        if music_player.current_song:
-            music_player.queue.add_to_front(music_player.current_song)
-
-        music_player.queue.add_to_front(prev_song)
         await interaction.response.send_message("⏮️ Playing previous", ephemeral=True, delete_after=3)
 
-    @discord.ui.button(label="Skip", style=discord.ButtonStyle.secondary, emoji="⏭️", row=0)
+    @discord.ui.button(label="Skip", style=discord.ButtonStyle.secondary, emoji="⏭️", row=0, custom_id="konoha:setup:skip")
     async def skip_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Skip song button."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.is_playing:
+        if not music_player or not music_player.is_playing:
             await interaction.response.send_message("❌ Nothing is currently playing!", ephemeral=True)
             return
 
-        music_player.skip()
+        await music_player.execute(music_player.skip)
         await interaction.response.send_message("⏭️ Skipped", ephemeral=True, delete_after=3)
 
-    @discord.ui.button(label="Stop", style=discord.ButtonStyle.danger, emoji="⏹️", row=0)
+    @discord.ui.button(label="Stop", style=discord.ButtonStyle.danger, emoji="⏹️", row=0, custom_id="konoha:setup:stop")
     async def stop_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Stop playback button."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        music_player.stop()
-        music_player.clear_queue()
+        if music_player:
+            await music_player.execute(music_player.stop_and_clear)
         await interaction.response.send_message("⏹️ Stopped", ephemeral=True, delete_after=3)
 
-    @discord.ui.button(label="Queue", style=discord.ButtonStyle.secondary, emoji="📋", row=1)
+    @discord.ui.button(label="Queue", style=discord.ButtonStyle.secondary, emoji="📋", row=1, custom_id="konoha:setup:queue")
     async def queue_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Show queue button."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
-        queue_info = music_player.get_queue_info()
+        music_player = self.bot.peek_music_player(interaction.guild.id)
+        queue_info = music_player.get_queue_info() if music_player else IDLE_QUEUE_INFO
 
         embed = discord.Embed(title="🎵 Current Queue", color=discord.Color.blue())
 
@@ -886,36 +1025,31 @@ class SetupControlView(discord.ui.View):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @discord.ui.button(label="Rewind", style=discord.ButtonStyle.secondary, emoji="⏪", row=1)
+    @discord.ui.button(label="Rewind", style=discord.ButtonStyle.secondary, emoji="⏪", row=1, custom_id="konoha:setup:rewind")
     async def rewind_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Rewind current song button."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.current_song:
+        if not music_player or not music_player.current_song:
             await interaction.response.send_message("❌ No song is currently playing!", ephemeral=True)
             return
 
-        if music_player.voice_client and music_player.voice_client.is_playing():
-            music_player.voice_client.stop()
-
-        music_player.queue.add_to_front(music_player.current_song)
-
-        await asyncio.sleep(1)  # Wait for song to restart
+        await music_player.execute(music_player.rewind)
         await self.update_panel(interaction)
 
-    @discord.ui.button(label="Loop Off", style=discord.ButtonStyle.secondary, emoji="🔄", row=1)
+    @discord.ui.button(label="Loop Off", style=discord.ButtonStyle.secondary, emoji="🔄", row=1, custom_id="konoha:setup:loop")
     async def loop_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Toggle loop mode button."""
         music_player = self.bot.get_music_player(interaction.guild.id)
 
         # Default to queue mode when turning on loop from panel
         if music_player.loop_mode == "off":
-            music_player.set_loop_mode("queue")
+            await music_player.execute(music_player.set_loop_mode, "queue")
             button.label = "Loop Queue"
             button.emoji = "🔁"
             button.style = discord.ButtonStyle.success
         else:
-            music_player.set_loop_mode("off")
+            await music_player.execute(music_player.set_loop_mode, "off")
             button.label = "Loop Off"
             button.emoji = "🔄"
             button.style = discord.ButtonStyle.secondary
@@ -924,12 +1058,14 @@ class SetupControlView(discord.ui.View):
         await self.update_panel(interaction)
 
     def update_button_states(self, music_player):
-        """Update all button states based on current player state."""
+        """Update all button states based on current player state (None for a guild without a player)."""
+        is_paused = music_player.is_paused if music_player else False
+        loop_mode = music_player.loop_mode if music_player else "off"
         for item in self.children:
             if hasattr(item, 'label'):
                 # Update pause/resume button
                 if 'Pause' in item.label or 'Resume' in item.label:
-                    if music_player.is_paused:
+                    if is_paused:
                         item.label = "Resume"
                         item.emoji = "▶️"
                     else:
@@ -938,15 +1074,15 @@ class SetupControlView(discord.ui.View):
 
                 # Update loop button
                 elif 'Loop' in item.label:
-                    if music_player.loop_mode == "off":
+                    if loop_mode == "off":
                         item.label = "Loop Off"
                         item.emoji = "🔄"
                         item.style = discord.ButtonStyle.secondary
-                    elif music_player.loop_mode == "current":
+                    elif loop_mode == "current":
                         item.label = "Loop Current"
                         item.emoji = "🔂"
                         item.style = discord.ButtonStyle.success
-                    elif music_player.loop_mode == "queue":
+                    elif loop_mode == "queue":
                         item.label = "Loop Queue"
                         item.emoji = "🔁"
                         item.style = discord.ButtonStyle.success
@@ -957,7 +1093,7 @@ class SetupControlView(discord.ui.View):
         for item in self.children:
             item.disabled = True
 
-    @discord.ui.button(label="Ping", style=discord.ButtonStyle.secondary, emoji="🏓", row=1)
+    @discord.ui.button(label="Ping", style=discord.ButtonStyle.secondary, emoji="🏓", row=1, custom_id="konoha:setup:ping")
     async def ping_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Ping button."""
         latency = round(self.bot.latency * 1000)
@@ -965,110 +1101,111 @@ class SetupControlView(discord.ui.View):
 
     async def sync_panel(self):
         """Sync the setup panel with current song info."""
-        channel = self.bot.get_channel(self.channel_id)
-        if channel:
-            try:
-                messages = [message async for message in channel.history(limit=20)]
-                for message in messages:
-                    if message.author == self.bot.user and message.embeds and message.embeds[0].footer and "Music Control Panel" in message.embeds[0].footer.text:
-                        # Get updated embed
-                        music_player = self.bot.get_music_player(message.guild.id)
-
-                        # Update button states first
-                        self.update_button_states(music_player)
-
-                        if music_player.current_song:
-                            current = music_player.current_song
-                            platform_emoji = {
-                                'youtube': '🎥',
-                                'spotify': '🎵', 
-                                'soundcloud': '🔊'
-                            }.get(current.get('platform', 'youtube'), '🎵')
-
-                            # Status based on playing state
-                            if music_player.is_paused:
-                                status = "⏸️ Paused"
-                            elif music_player.is_playing:
-                                status = "🎵 Now Playing"
-                            else:
-                                status = "⏹️ Stopped"
-
-                            embed = discord.Embed(
-                                title=f"[ {status} ]",
-                                description=f"**{current['title']}**",
-                                color=discord.Color.purple()
-                            )
-
-                            # Add song details
-                            embed.add_field(
-                                name="🎵 Song Details",
-                                value=(
-                                    f"**{platform_emoji} {current['title']}**\n"
-                                    f"🎤 **Author:** {current.get('uploader', 'Unknown')}\n"
-                                    f"🔗 **Source:** {current.get('platform', 'youtube').title()}\n"
-                                    f"⏱️ **Duration:** {format_duration(current.get('duration', 0))}\n"
-                                    f"👤 **Requested By:** {current['requester'].mention}"
-                                ),
-                                inline=False
-                            )
-
-                            if current.get('thumbnail'):
-                                embed.set_image(url=current['thumbnail'])
-
-                            # Status info
-                            embed.add_field(
-                                name="🔊 Volume",
-                                value=f"{int(music_player.volume * 100)}%",
-                                inline=True
-                            )
-
-                            loop_text = {
-                                "off": "🔄 Off",
-                                "current": "🔂 Current",
-                                "queue": "🔁 Queue"
-                            }.get(music_player.loop_mode, "🔄 Off")
-                            loop_status = loop_text
-                            embed.add_field(
-                                name="Loop Mode",
-                                value=loop_status,
-                                inline=True
-                            )
-
-                            queue_count = len(music_player.queue.get_all())
-                            embed.add_field(
-                                name="📋 Queue",
-                                value=f"{queue_count} songs",
-                                inline=True
-                            )
-                        else:
-                            embed = discord.Embed(
-                                title="[ No Song Playing ]",
-                                description="**Konoha Music** is a feature-rich Discord music bot currently in beta and under active development. Expect regular updates, new features, and occasional bugs as we work hard to deliver the best music experience for your server. Your feedback is appreciated as we continue to improve!\n\n**Send music name or youtube link to play.**",
-                                color=discord.Color.purple()
-                            )
-                            embed.add_field(
-                                name="🎵 Status",
-                                value="No music playing\nQueue is empty",
-                                inline=False
-                            )
-                            # Add the Konoha Music GIF
-                            embed.set_image(url="https://i.imgur.com/KonohaMusic.gif")
-
-                        embed.set_footer(text="Music Control Panel • Use buttons below to control playback")
-
-                        # Update message with better error handling
-                        try:
-                            await message.edit(embed=embed, view=self)
-                            self.logger.info(f"Panel synced successfully for guild {message.guild.id}")
-                        except discord.HTTPException as http_err:
-                            self.logger.error(f"HTTP error syncing panel: {http_err}")
-                        except Exception as edit_err:
-                            self.logger.error(f"Error editing panel message: {edit_err}")
-                        break
-            except Exception as e:
-                self.logger.error(f"Failed to sync panel: {e}")
-                import traceback
-                self.logger.error(traceback.format_exc())
+        if not self.message_id:
+            return
+
+        # bot.get_channel searches every guild; look in the panel's own guild instead
+        guild = self.bot.get_guild(self.guild_id)
+        channel = guild.get_channel(self.channel_id) if guild else None
+        if not channel:
+            return
+
+        # Rendering must not create a player for an idle or restored guild
+        music_player = self.bot.peek_music_player(self.guild_id)
+
+        # Update button states first
+        self.update_button_states(music_player)
+
+        if music_player and music_player.current_song:
+            current = music_player.current_song
+            platform_emoji = {
+                'youtube': '🎥',
+                'spotify': '🎵', 
+                'soundcloud': '🔊'
+            }.get(current.get('platform', 'youtube'), '🎵')
+
+            # Status based on playing state
+            if music_player.is_paused:
+                status = "⏸️ Paused"
+            elif music_player.is_playing:
+                status = "🎵 Now Playing"
+            else:
+                status = "⏹️ Stopped"
+
+            embed = discord.Embed(
+                title=f"[ {status} ]",
+                description=f"**{current['title']}**",
+                color=discord.Color.purple()
+            )
+
+            # Add song details
+            embed.add_field(
+                name="🎵 Song Details",
+                value=(
+                    f"**{platform_emoji} {current['title']}**\n"
+                    f"🎤 **Author:** {current.get('uploader', 'Unknown')}\n"
+                    f"🔗 **Source:** {current.get('platform', 'youtube').title()}\n"
+                    f"⏱️ **Duration:** {format_duration(current.get('duration', 0))}\n"
+                    f"👤 **Requested By:** {current['requester'].mention}"
+                ),
+                inline=False
+            )
+
+            if current.get('thumbnail'):
+                embed.set_image(url=current['thumbnail'])
+
+            # Status info
+            embed.add_field(
+                name="🔊 Volume",
+                value=f"{int(music_player.volume * 100)}%",
+                inline=True
+            )
+
+            loop_text = {
+                "off": "🔄 Off",
+                "current": "🔂 Current",
+                "queue": "🔁 Queue"
+            }.get(music_player.loop_mode, "🔄 Off")
+            loop_status = loop_text
+            embed.add_field(
+                name="Loop Mode",
+                value=loop_status,
+                inline=True
+            )
+
+            queue_count = len(music_player.queue.get_all())
+            embed.add_field(
+                name="📋 Queue",
+                value=f"{queue_count} songs",
+                inline=True
+            )
+        else:
+            embed = discord.Embed(
+                title="[ No Song Playing ]",
+                description="**Konoha Music** is a feature-rich Discord music bot currently in beta and under active development. Expect regular updates, new features, and occasional bugs as we work hard to deliver the best music experience for your server. Your feedback is appreciated as we continue to improve!\n\n**Send music name or youtube link to play.**",
+                color=discord.Color.purple()
+            )
+            embed.add_field(
+                name="🎵 Status",
+                value="No music playing\nQueue is empty",
+                inline=False
+            )
+            # Add the Konoha Music GIF
+            embed.set_image(url="https://i.imgur.com/KonohaMusic.gif")
+
+        embed.set_footer(text="Music Control Panel • Use buttons below to control playback")
+
+        # Edit the panel by its stored ID instead of searching the channel history
+        try:
+            await channel.get_partial_message(self.message_id).edit(embed=embed, view=self)
+            REST_EDITS.inc(kind='panel', **labels_for(self.bot, self.guild_id))
+            self.logger.info(f"Panel synced successfully for guild {self.guild_id}")
+        except discord.NotFound:
+            # Panel message was deleted - the player drops this view
+            self.bot.forget_setup_panel(self)
+            raise
+        except discord.HTTPException as http_err:
+            self.logger.error(f"HTTP error syncing panel: {http_err}")
 
 # Second row of buttons
 class MusicControlView2(discord.ui.View):
@@ -1081,13 +1218,13 @@ class MusicControlView2(discord.ui.View):
     @discord.ui.button(label="Shuffle", style=discord.ButtonStyle.secondary, emoji="🔀")
     async def shuffle_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Shuffle button handler."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if music_player.queue.is_empty():
+        if not music_player or music_player.queue.is_empty():
             await interaction.response.send_message("❌ Queue is empty!", ephemeral=True)
             return
 
-        music_player.queue.shuffle()
+        await music_player.execute(music_player.queue.shuffle)
         await interaction.response.send_message("🔀 Shuffled the queue!", ephemeral=True)
 
     @discord.ui.button(label="Loop", style=discord.ButtonStyle.secondary, emoji="🔄")
@@ -1095,23 +1232,20 @@ class MusicControlView2(discord.ui.View):
         """Loop button handler."""
         music_player = self.bot.get_music_player(interaction.guild.id)
 
-        loop_status = music_player.toggle_loop()
+        loop_status = await music_player.execute(music_player.toggle_loop)
         status_text = "enabled" if loop_status else "disabled"
         await interaction.response.send_message(f"🔄 Loop mode {status_text}", ephemeral=True)
 
     @discord.ui.button(label="Rewind", style=discord.ButtonStyle.secondary, emoji="⏪")
     async def rewind_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Rewind button handler."""
-        music_player = self.bot.get_music_player(interaction.guild.id)
+        music_player = self.bot.peek_music_player(interaction.guild.id)
 
-        if not music_player.current_song:
+        if not music_player or not music_player.current_song:
             await interaction.response.send_message("❌ No song is currently playing!", ephemeral=True)
             return
 
-        if music_player.voice_client and music_player.voice_client.is_playing():
-            music_player.voice_client.stop()
-
-        music_player.queue.add_to_front(music_player.current_song)
+        await music_player.execute(music_player.rewind)
         await interaction.response.send_message("⏪ Rewinding current song!", ephemeral=True)
 
     @discord.ui.button(label="Clear", style=discord.ButtonStyle.danger, emoji="🗑️")
@@ -0,0 +1,115 @@
+import audioop
+import math
+import discord
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+SILENCE = bytes(FRAME_SIZE)
+
+_curves = {}  # fade length in frames -> (fade in gains, fade out gains)
+
+
+def fade_curves(frames):
+    """Get equal-power fade gains, one per 20ms frame."""
+    if frames not in _curves:
+        steps = [(index + 1) / (frames + 1) for index in range(frames)]
+        _curves[frames] = (
+            tuple(math.sin(step * math.pi / 2) for step in steps),
+            tuple(math.cos(step * math.pi / 2) for step in steps)
+        )
+    return _curves[frames]
+
+
+class CrossfadeSource(discord.AudioSource):
+    """PCM source that fades a song in over the tail of the previous one.
+
+    The outgoing song's source is handed over from the previous CrossfadeSource:
+    once ``end_at`` frames have been played and ``ready()`` says the next song's
+    source exists, ``read`` ends this song early but keeps its source alive so
+    the next CrossfadeSource can take it with ``detach``. Mixing uses audioop on
+    whole frames; with no fade in progress ``read`` passes frames straight through.
+    """
+
+    def __init__(self, source, *, fade_frames, outgoing=None, end_at=None, ready=None):
+        self.source = source
+        self.outgoing = outgoing
+        self.fade_frames = fade_frames
+        self.end_at = end_at
+        self.ready = ready
+        self.handed_over = False
+        self._step = 0
+        self._fade_in, self._fade_out = fade_curves(fade_frames)
+
+    def __getattr__(self, name):
+        # Position, metadata and seek/pause hooks come from the current song's source
+        source = self.__dict__.get('source')
+        if source is None:
+            raise AttributeError(name)
+        return getattr(source, name)
+
+    @property
+    def volume(self):
+        return self.source.volume
+
+    @volume.setter
+    def volume(self, value):
+        self.source.volume = value
+
+    @property
+    def gain(self):
+        return self.source.gain
+
+    @gain.setter
+    def gain(self, value):
+        self.source.gain = value
+
+    def is_opus(self):
+        return False
+
+    def read(self):
+        if self.end_at is not None and self.source.frames >= self.end_at and self.ready():
+            self.handed_over = True
+            return b''
+
+        data = self.source.read()
+        if self.outgoing is None:
+            return data
+        return self._mix(data)
+
+    def _mix(self, data):
+        tail = self.outgoing.read()
+        step = self._step
+        if not tail or step >= self.fade_frames:
+            self.outgoing.cleanup()
+            self.outgoing = None
+            return data
+
+        self._step += 1
+        if len(data) < FRAME_SIZE:
+            data += SILENCE[len(data):]
+        if len(tail) < FRAME_SIZE:
+            tail += SILENCE[len(tail):]
+        return audioop.add(
+            audioop.mul(data, SAMPLE_WIDTH, self._fade_in[step]),
+            audioop.mul(tail, SAMPLE_WIDTH, self._fade_out[step]),
+            SAMPLE_WIDTH
+        )
+
+    def replace(self, source):
+        """Swap in a new source for this song (after a seek); returns the sources it replaces."""
+        retired = [self.source, self.outgoing]
+        self.source, self.outgoing = source, None
+        return retired
+
+    def detach(self):
+        """Take this song's source so the next song can fade it out."""
+        source, self.source = self.source, None
+        return source
+
+    def cleanup(self):
+        if self.outgoing is not None:
+            self.outgoing.cleanup()
+            self.outgoing = None
+        # A handed-over source now belongs to the next song's CrossfadeSource
+        if self.source is not None and not self.handed_over:
+            self.source.cleanup()
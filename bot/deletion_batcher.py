@@ -0,0 +1,81 @@
+import asyncio
+import datetime
+import logging
+import time
+import discord
+from config import Config
+from .metrics import REST_EDITS, labels_for
+
+BULK_DELETE_LIMIT = 100  # Messages per bulk delete call
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14)  # Discord rejects older messages in bulk deletes
+
+
+class DeletionBatcher:
+    """Deletes messages after a delay, in bulk per channel.
+
+    ``schedule`` only records the message. A timer task collects the expired
+    messages of each channel and removes them with one bulk delete call per 100.
+    Messages too old for a bulk delete, or left alone in their batch, are
+    deleted one by one.
+    """
+
+    def __init__(self, bot, interval=None):
+        self.bot = bot
+        self.interval = interval or Config.DELETE_BATCH_INTERVAL
+        self.logger = logging.getLogger(__name__)
+        self.pending = {}  # channel id -> (channel, [(due, message)])
+        self.task = None
+
+    def schedule(self, message, delay=0.0):
+        """Delete a message once ``delay`` seconds have passed."""
+        if message is None:
+            return
+        queued = self.pending.setdefault(message.channel.id, (message.channel, []))[1]
+        queued.append((time.monotonic() + delay, message))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self.pending:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self, everything=False):
+        """Delete expired messages (or all pending ones)."""
+        now = time.monotonic()
+        for channel_id, (channel, queued) in list(self.pending.items()):
+            expired = [message for due, message in queued if everything or due <= now]
+            if not expired:
+                continue
+            remaining = [(due, message) for due, message in queued if not (everything or due <= now)]
+            if remaining:
+                self.pending[channel_id] = (channel, remaining)
+            else:
+                del self.pending[channel_id]
+            await self._delete(channel, expired)
+
+    async def _delete(self, channel, messages):
+        labels = labels_for(self.bot, channel.guild.id)
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE + datetime.timedelta(minutes=1)
+        recent = [message for message in messages if message.created_at > cutoff]
+        single = [message for message in messages if message.created_at <= cutoff]
+
+        for start in range(0, len(recent), BULK_DELETE_LIMIT):
+            batch = recent[start:start + BULK_DELETE_LIMIT]
+            if len(batch) == 1:
+                single.extend(batch)
+                continue
+            try:
+                await channel.delete_messages(batch)
+                REST_EDITS.inc(kind='bulk_delete', **labels)
+            except discord.HTTPException as e:
+                # One unknown or undeletable message fails the whole batch
+                self.logger.debug(f"Bulk delete in {channel.id} failed, deleting one by one: {e}")
+                single.extend(batch)
+
+        for message in single:
+            try:
+                await message.delete()
+                REST_EDITS.inc(kind='delete', **labels)
+            except discord.HTTPException:
+                pass  # Already deleted or no permission
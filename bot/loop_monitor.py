@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from config import Config
+from .metrics import REGISTRY
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    'konoha_event_loop_lag_seconds', 'Event loop scheduling lag',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+LOOP_STALLS = REGISTRY.counter(
+    'konoha_event_loop_stalls_total', 'Times the event loop was blocked past the stall threshold')
+
+
+class LoopMonitor:
+    """Watchdog that measures event loop lag and captures stacks of stalls.
+
+    A heartbeat task runs on the loop. A separate thread watches the heartbeat and,
+    while it is late, samples the loop thread's stack so blocking calls can be found.
+    """
+
+    def __init__(self, interval=None, stall_threshold=None, sample_interval=None):
+        self.interval = interval or Config.LOOP_MONITOR_INTERVAL
+        self.stall_threshold = stall_threshold or Config.LOOP_STALL_THRESHOLD
+        self.sample_interval = sample_interval or Config.LOOP_STALL_SAMPLE_INTERVAL
+        self.logger = logging.getLogger(__name__)
+        self.lag_samples = deque(maxlen=1200)  # Recent lag measurements in seconds
+        self.stalls = deque(maxlen=Config.LOOP_STALL_HISTORY)  # Recent stall reports
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the heartbeat task and watchdog thread on the running loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def _run(self):
+        while not self._stopped.is_set():
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            self.lag_samples.append(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self):
+        """Sample the loop thread's stack while the heartbeat is overdue."""
+        while not self._stopped.wait(self.sample_interval):
+            overdue = time.monotonic() - self._heartbeat - self.interval
+            if overdue < self.stall_threshold:
+                continue
+
+            stall_started = self._heartbeat
+            samples = Counter()
+            while not self._stopped.is_set() and self._heartbeat == stall_started:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    samples[''.join(traceback.format_stack(frame, limit=Config.LOOP_STALL_STACK_DEPTH))] += 1
+                time.sleep(self.sample_interval)
+            self._record_stall(time.monotonic() - stall_started - self.interval, samples)
+
+    def _record_stall(self, duration, samples):
+        LOOP_STALLS.inc()
+        top_stack, hits = samples.most_common(1)[0] if samples else ("<no samples>", 0)
+        self.stalls.append({
+            'time': time.strftime('%H:%M:%S'),
+            'duration': round(duration, 3),
+            'samples': sum(samples.values()),
+            'stack': top_stack,
+            'stack_hits': hits
+        })
+        self.logger.warning(
+            f"Event loop blocked for {duration:.3f}s "
+            f"({hits}/{sum(samples.values())} samples in this stack):\n{top_stack}"
+        )
+
+    def percentiles(self):
+        """Get lag percentiles in milliseconds over the recent window."""
+        if not self.lag_samples:
+            return {}
+        ordered = sorted(self.lag_samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+        return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': pick(1.0)}
@@ -0,0 +1,105 @@
+import audioop
+import json
+import logging
+import math
+import os
+from config import Config
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+def track_key(song_info):
+    """Get the cache key of a track: platform and extractor ID, or the URL without an ID."""
+    if song_info.get('id'):
+        return f"{song_info.get('platform') or 'youtube'}:{song_info['id']}"
+    return song_info.get('url')
+
+
+class LoudnessMeter:
+    """Measures the average loudness (RMS) of PCM frames as they are played.
+
+    Frames quieter than the silence gate are skipped so intros and gaps do not
+    pull the level down.
+    """
+
+    def __init__(self):
+        self.energy = 0.0
+        self.frames = 0
+
+    def add(self, frame):
+        rms = audioop.rms(frame, SAMPLE_WIDTH)
+        if rms >= Config.LOUDNESS_SILENCE_RMS:
+            self.energy += rms * rms
+            self.frames += 1
+
+    @property
+    def seconds(self):
+        return self.frames * 0.02
+
+    @property
+    def rms(self):
+        return math.sqrt(self.energy / self.frames) if self.frames else None
+
+
+class LoudnessCache:
+    """Measured loudness per track, persisted as JSON under the data directory.
+
+    Every shard cluster shares the file, so ``save`` merges this process's new
+    measurements into what is on disk instead of overwriting it.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.LOUDNESS_CACHE_FILE
+        self.logger = logging.getLogger(__name__)
+        self.levels = self._load()  # track key -> RMS
+        self.unsaved = {}  # Measurements made since the last save
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to load loudness cache: {e}")
+        return {}
+
+    def __len__(self):
+        return len(self.levels)
+
+    def gain(self, key):
+        """Get the gain that brings a track to the target level, or None if it was never measured."""
+        rms = self.levels.get(key)
+        if not rms:
+            return None
+        return max(Config.LOUDNESS_MIN_GAIN, min(Config.LOUDNESS_MAX_GAIN, Config.LOUDNESS_TARGET_RMS / rms))
+
+    def store(self, key, meter):
+        """Save a finished measurement if it covered enough audio."""
+        if key and meter.seconds >= Config.LOUDNESS_MIN_SECONDS:
+            self.levels[key] = round(meter.rms, 1)
+            self.unsaved[key] = self.levels[key]
+
+    def save(self):
+        """Merge new measurements into the file on disk (blocking)."""
+        if not self.unsaved:
+            return
+        # Measurements are added from the event loop meanwhile
+        unsaved, self.unsaved = self.unsaved, {}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            levels = self._load()
+            levels.update(unsaved)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"  # One per cluster process
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(levels, handle)
+            os.replace(tmp_path, self.path)
+            # Pick up what the other clusters measured
+            for key, rms in levels.items():
+                self.levels.setdefault(key, rms)
+        except OSError as e:
+            for key, rms in unsaved.items():
+                self.unsaved.setdefault(key, rms)
+            self.logger.error(f"Failed to save loudness cache: {e}")
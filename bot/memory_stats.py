@@ -0,0 +1,178 @@
+import itertools
+import sys
+import tracemalloc
+from collections import deque
+from config import Config
+from .metrics import REGISTRY, labels_for
+
+GUILD_MEMORY_BYTES = REGISTRY.gauge(
+    'konoha_guild_memory_bytes', 'Estimated memory held per guild, by structure', ['shard', 'guild', 'structure'])
+SHARED_MEMORY_BYTES = REGISTRY.gauge(
+    'konoha_shared_memory_bytes', 'Estimated memory of bot-wide caches and indexes', ['structure'])
+TRACEMALLOC_BYTES = REGISTRY.gauge(
+    'konoha_tracemalloc_traced_bytes', 'Memory traced by tracemalloc (0 while tracing is off)')
+
+CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+
+
+def deep_sizeof(obj, seen=None):
+    """Estimate the bytes held by an object and the containers inside it.
+
+    Only builtin containers are followed. Other objects (members, voice clients,
+    sources) are counted shallowly, so a song's requester does not pull in the
+    whole guild cache.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, CONTAINERS):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    return size
+
+
+def sampled_sizeof(mapping, sample=None):
+    """Estimate the deep size of a large dict from a sample of its items, scaled to its length.
+
+    Walking every item of the title index or the play history takes hundreds of
+    milliseconds, which would stall the event loop.
+    """
+    sample = sample or Config.MEMORY_SAMPLE_SIZE
+    if len(mapping) <= sample:
+        return deep_sizeof(mapping)
+    seen = set()
+    sampled = sum(
+        deep_sizeof(key, seen) + deep_sizeof(value, seen)
+        for key, value in itertools.islice(mapping.items(), sample)
+    )
+    return sys.getsizeof(mapping) + sampled * len(mapping) // sample
+
+
+def index_sizeof(index, sample=None):
+    """Estimate the bytes of a key -> set of URLs index without walking the URLs.
+
+    The URL strings are shared with the index entries, so only the keys and sets
+    are counted, and only every n-th of them once the index outgrows the sample.
+    """
+    step = max(1, len(index) // (sample or Config.MEMORY_SAMPLE_SIZE * 10))
+    keys = sum(map(sys.getsizeof, itertools.islice(index, 0, None, step)))
+    sets = sum(map(sys.getsizeof, itertools.islice(index.values(), 0, None, step)))
+    return sys.getsizeof(index) + (keys + sets) * step
+
+
+def view_sizeof(view, seen=None):
+    """Estimate the bytes held by a panel view and its buttons."""
+    if seen is None:
+        seen = set()
+    size = sys.getsizeof(view) + deep_sizeof(vars(view), seen)  # Counts the buttons shallowly
+    for item in view.children:
+        size += deep_sizeof(vars(item), seen)
+    return size
+
+
+def player_memory(bot, music_player):
+    """Estimate the memory of one guild's player, per structure."""
+    seen = set()
+    sizes = {
+        'queue': deep_sizeof(music_player.queue.get_all(), seen),
+        'previous_songs': deep_sizeof(music_player.previous_songs, seen),
+        'current_song': deep_sizeof(music_player.current_song, seen),
+        'resume_point': deep_sizeof(music_player.resume_point, seen),
+        'panels': sum(view_sizeof(view, seen) for view in music_player.setup_panels),
+        'play_history': deep_sizeof(bot.play_history.guilds.get(music_player.guild_id), seen)
+    }
+    prefetched = music_player.prefetched[1] if music_player.prefetched else None
+    buffer = getattr(prefetched, '_buffer', None)
+    sizes['prefetch_buffer'] = deep_sizeof(buffer, seen) if buffer is not None else 0
+    return sizes
+
+
+def shared_memory(bot):
+    """Estimate the memory of bot-wide caches and indexes."""
+    views = list(itertools.islice(bot.setup_views.values(), Config.MEMORY_SAMPLE_SIZE))
+    return {
+        'title_index': sampled_sizeof(bot.title_index.entries) + index_sizeof(bot.title_index.prefixes)
+        + index_sizeof(bot.title_index.words) + index_sizeof(bot.title_index.initials),
+        'play_history': sampled_sizeof(bot.play_history.guilds),
+        'loudness_cache': sampled_sizeof(bot.loudness_cache.levels),
+        'setup_views': sum(view_sizeof(view) for view in views) * len(bot.setup_views) // len(views) if views else 0
+    }
+
+
+def memory_report(bot):
+    """Estimate memory per guild and per shared structure.
+
+    Returns (guilds, shared): guild_id -> {structure: bytes} and {structure: bytes}.
+    """
+    guilds = {
+        guild_id: player_memory(bot, music_player)
+        for guild_id, music_player in list(bot.music_players.items())
+    }
+    return guilds, shared_memory(bot)
+
+
+def collect_memory_metrics(bot):
+    """Refresh the memory gauges from a fresh estimate (run on an interval, not per scrape)."""
+    guilds, shared = memory_report(bot)
+    GUILD_MEMORY_BYTES.clear()
+    for guild_id, sizes in guilds.items():
+        labels = labels_for(bot, guild_id)
+        for structure, size in sizes.items():
+            GUILD_MEMORY_BYTES.inc(size, structure=structure, **labels)
+    for structure, size in shared.items():
+        SHARED_MEMORY_BYTES.set(size, structure=structure)
+    TRACEMALLOC_BYTES.set(tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0)
+
+
+class MemoryProfiler:
+    """On-demand tracemalloc tracing with snapshot diffs.
+
+    ``start`` takes a baseline snapshot; each ``snapshot`` is compared with the
+    one before it, so growth between two calls shows up at the top.
+    """
+
+    def __init__(self, frames=None):
+        self.frames = frames or Config.TRACEMALLOC_FRAMES
+        self.previous = None
+        self.snapshots = 0
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Start tracing and take the baseline snapshot (blocking)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.previous = self._take()
+        self.snapshots = 0
+
+    def stop(self):
+        """Stop tracing and drop the stored snapshot."""
+        tracemalloc.stop()
+        self.previous = None
+
+    def snapshot(self, limit=None):
+        """Take a snapshot and diff it against the previous one (blocking).
+
+        Returns the top allocation sites by growth as tracemalloc StatisticDiff objects.
+        """
+        current = self._take()
+        diff = current.compare_to(self.previous, 'lineno') if self.previous else []
+        self.previous = current
+        self.snapshots += 1
+        return diff[:limit or Config.TRACEMALLOC_TOP]
+
+    def _take(self):
+        snapshot = tracemalloc.take_snapshot()
+        # Leave out the tracer's own bookkeeping
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
@@ -0,0 +1,251 @@
+import logging
+import math
+import threading
+from aiohttp import web
+from config import Config
+from .sharding import shard_for_guild
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class for a labelled metric family."""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, dict(state, buckets=list(state['buckets']))) for key, state in self._values.items()]
+        for key, state in items:
+            for bound, count in zip(self.buckets, state['buckets']):
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state['sum']}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # Callables run before each scrape
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class GuildLabeler:
+    """Maps guild IDs to label values, capping how many distinct guilds are exported."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._labelled = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, guild_id):
+        with self._lock:
+            if guild_id in self._labelled:
+                return str(guild_id)
+            if len(self._labelled) < self.limit:
+                self._labelled.add(guild_id)
+                return str(guild_id)
+        return "other"
+
+
+REGISTRY = MetricsRegistry()
+guild_label = GuildLabeler(Config.METRICS_MAX_GUILD_LABELS)
+
+SEARCH_SECONDS = REGISTRY.histogram(
+    'konoha_search_seconds', 'Time spent resolving a query in YTDLSource.search', ['shard', 'guild'])
+RESOLVE_SECONDS = REGISTRY.histogram(
+    'konoha_resolve_seconds', 'Time spent creating a playable source in YTDLSource.create_source', ['shard', 'guild'])
+FIRST_AUDIO_SECONDS = REGISTRY.histogram(
+    'konoha_play_to_first_audio_seconds', 'Time from a play request to the first audio packet', ['shard', 'guild'])
+PANEL_SYNC_SECONDS = REGISTRY.histogram(
+    'konoha_panel_sync_seconds', 'Time spent syncing setup panels', ['shard', 'guild'])
+REST_EDITS = REGISTRY.counter(
+    'konoha_rest_edits_total', 'REST edit calls made by the bot', ['shard', 'guild', 'kind'])
+QUEUE_DEPTH = REGISTRY.gauge(
+    'konoha_queue_depth', 'Songs waiting in the queue', ['shard', 'guild'])
+MAILBOX_DEPTH = REGISTRY.gauge(
+    'konoha_mailbox_depth', 'Player calls waiting in the per-guild mailbox', ['shard', 'guild'])
+VOICE_CLIENTS = REGISTRY.gauge(
+    'konoha_voice_clients', 'Connected voice clients', ['shard'])
+MUSIC_PLAYERS = REGISTRY.gauge(
+    'konoha_music_players', 'Music players held in memory', ['shard'])
+PLAYERS_EVICTED = REGISTRY.counter(
+    'konoha_players_evicted_total', 'Idle music players dropped by the sweeper', ['shard'])
+HISTORY_HITS = REGISTRY.counter(
+    'konoha_history_hits_total', 'Queries resolved from play history without yt-dlp', ['shard', 'guild'])
+STREAM_FORMATS = REGISTRY.counter(
+    'konoha_stream_formats_total', 'Streams opened, by voice channel bitrate and chosen format',
+    ['shard', 'channel_kbps', 'format', 'codec'])
+STREAM_RECOVERIES = REGISTRY.counter(
+    'konoha_stream_recoveries_total', 'Stalled or broken streams reopened by the watchdog', ['shard', 'guild', 'reason'])
+EXTRACTION_IN_FLIGHT = REGISTRY.gauge(
+    'konoha_extraction_in_flight', 'yt-dlp extractions running or waiting in the extraction pool')
+EXTRACTION_WORKERS = REGISTRY.gauge(
+    'konoha_extraction_workers', 'Size of the yt-dlp extraction thread pool')
+
+
+def labels_for(bot, guild_id):
+    """Get the shard and bounded guild labels for a guild."""
+    return {
+        'shard': shard_for_guild(guild_id, bot.shard_count),
+        'guild': guild_label(guild_id)
+    }
+
+
+def collect_player_metrics(bot):
+    """Refresh per-guild gauges from the live music players."""
+    QUEUE_DEPTH.clear()
+    MAILBOX_DEPTH.clear()
+    VOICE_CLIENTS.clear()
+    MUSIC_PLAYERS.clear()
+    voice_clients = {}
+    for guild_id, music_player in list(bot.music_players.items()):
+        labels = labels_for(bot, guild_id)
+        QUEUE_DEPTH.inc(music_player.queue.size(), **labels)
+        MAILBOX_DEPTH.inc(music_player.mailbox.qsize(), **labels)
+        MUSIC_PLAYERS.inc(shard=labels['shard'])
+        if music_player.voice_client and music_player.voice_client.is_connected():
+            voice_clients[labels['shard']] = voice_clients.get(labels['shard'], 0) + 1
+    for shard, count in voice_clients.items():
+        VOICE_CLIENTS.set(count, shard=shard)
+
+
+async def start_metrics_server(bot, host, port):
+    """Serve /metrics in the Prometheus text format."""
+    REGISTRY.add_collector(lambda: collect_player_metrics(bot))
+
+    async def handle_metrics(request):
+        return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logging.getLogger(__name__).info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return runner
@@ -2,44 +2,32 @@ import discord
 from discord.ext import commands
 import logging
 import asyncio
+import hashlib
+import json
+import math
+import os
 from .music_player import MusicPlayer
-from .commands import MusicCommands
-from .utils import format_duration
+from .queue_journal import QueueJournal
+from .setup_store import SetupStore
+from .sharding import ShardedGuildMap, shard_for_guild
+from .audio_workers import AudioWorkerPool
+from .metrics import PLAYERS_EVICTED, start_metrics_server
+from .memory_stats import MemoryProfiler, collect_memory_metrics
+from .loop_monitor import LoopMonitor
+from .tracing import trace
+from .startup import StartupTimer, load_opus
+from .title_index import TitleIndex
+from .play_history import PlayHistory
+from .loudness import LoudnessCache
+from .deletion_batcher import DeletionBatcher
+from .commands import MusicCommands, SetupControlView
+from .utils import format_duration, get_yt_dlp
 from config import Config
 
-# Load Opus library for voice support
-import os
-import ctypes.util
-
-def load_opus():
-    # Try to load opus library
-    if not discord.opus.is_loaded():
-        # Try different possible opus library names
-        opus_libs = [
-            'libopus.so.0',
-            'libopus.so',
-            'opus',
-            ctypes.util.find_library('opus')
-        ]
-        
-        for lib in opus_libs:
-            if lib:
-                try:
-                    discord.opus.load_opus(lib)
-                    print(f"Successfully loaded opus library: {lib}")
-                    break
-                except Exception as e:
-                    print(f"Failed to load {lib}: {e}")
-                    continue
-        else:
-            print("Could not load opus library - trying to continue without it")
-
-load_opus()
-
-class MusicBot(commands.Bot):
+class MusicBot(commands.AutoShardedBot):
     """Main Discord music bot class."""
     
-    def __init__(self):
+    def __init__(self, shard_ids=None, shard_count=None, cluster_id=None, load_reports=None, started=None):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.voice_states = True
@@ -48,29 +36,145 @@ class MusicBot(commands.Bot):
         super().__init__(
             command_prefix=Config.COMMAND_PREFIX,
             intents=intents,
-            help_command=None
+            help_command=None,
+            shard_ids=shard_ids,
+            shard_count=shard_count
         )
         
-        self.music_players = {}
-        self.setup_channels = {}  # Track setup channels per guild
+        # Per-guild state is partitioned by shard
+        self.music_players = ShardedGuildMap(shard_count)
+        self.setup_channels = ShardedGuildMap(shard_count)  # Track setup channels per guild
+        self.setup_views = ShardedGuildMap(shard_count)  # Latest control panel view per guild
+        self.setup_store = SetupStore()  # Setup channels and panel messages across restarts
+
+        # Shard cluster settings (set when launched as a cluster worker process)
+        self.cluster_id = cluster_id
+        self.load_reports = load_reports
         self.logger = logging.getLogger(__name__)
+
+        # Crash-safe queue persistence
+        self.queue_journal = QueueJournal() if Config.QUEUE_JOURNAL_ENABLED else None
+        self.pending_restores = {}  # guild_id -> journal state waiting to be rebuilt
+        self._restores_started = False
+
+        # Optional pool of processes that run ffmpeg and Opus encoding
+        self.audio_workers = AudioWorkerPool(Config.AUDIO_WORKERS) if Config.AUDIO_WORKERS > 0 else None
+        self.metrics_runner = None  # Metrics HTTP endpoint, when enabled
+        self.loop_monitor = LoopMonitor() if Config.LOOP_MONITOR_ENABLED else None
+        self.title_index = TitleIndex()  # Titles resolved so far, for /play autocomplete
+        self.play_history = PlayHistory()  # Songs each guild played recently
+        self.loudness_cache = LoudnessCache()  # Measured loudness per track
+        self.deletions = DeletionBatcher(self)  # Setup channel chatter waiting to be deleted
+        self.memory_profiler = MemoryProfiler()  # tracemalloc snapshots taken by /memory
+
+        # Per-phase startup timing; heavy libraries are loaded after on_ready
+        self.startup = StartupTimer(started)
+        self.startup.mark('imports')
+        self.warm_up_task = None
         
     async def setup_hook(self):
         """Setup hook called when bot is ready."""
+        self.startup.mark('login')
+
+        # Watch for blocking calls on the event loop
+        if self.loop_monitor:
+            self.loop_monitor.start()
+
         # Add music commands cog
         await self.add_cog(MusicCommands(self))
+        self.startup.mark('cog')
+
+        # Start audio workers before any guild can play
+        if self.audio_workers:
+            await asyncio.get_running_loop().run_in_executor(None, self.audio_workers.start)
+            asyncio.create_task(self.audio_workers.supervise())
+            self.startup.mark('audio_workers')
         
         # Sync slash commands
+        await self.sync_commands()
+        self.startup.mark('command_sync')
+
+        # Re-attach control panels from before the restart (no REST calls)
+        self.restore_setup_panels()
+        self.startup.mark('setup_panels')
+
+        # Load queues that were active before the last shutdown
+        if self.queue_journal:
+            self.pending_restores = self.queue_journal.load_all(owns=self.owns_guild)
+            if self.pending_restores:
+                self.logger.info(f"Found saved queues for {len(self.pending_restores)} guilds")
+            asyncio.create_task(self.compact_queue_journals())
+            self.startup.mark('journal_load')
+
+        asyncio.create_task(self.save_loudness_cache())
+        asyncio.create_task(self.evict_idle_players())
+
+        # Expose playback metrics (one port per cluster)
+        if Config.METRICS_PORT:
+            try:
+                port = Config.METRICS_PORT + (self.cluster_id or 0)
+                self.metrics_runner = await start_metrics_server(self, Config.METRICS_HOST, port)
+                if Config.MEMORY_METRICS_ENABLED:
+                    asyncio.create_task(self.refresh_memory_metrics())
+            except Exception as e:
+                self.logger.error(f"Failed to start metrics endpoint: {e}")
+
+        # Report load to the cluster launcher
+        if self.load_reports is not None:
+            asyncio.create_task(self.report_cluster_load())
+    
+    def command_tree_hash(self):
+        """Hash the payload that a global command sync would upload."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: (command['name'], command.get('type', 1))
+        )
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    async def sync_commands(self, force=False):
+        """Sync slash commands only when the command tree changed since the last sync."""
+        # Global commands are shared by all clusters - one sync is enough
+        if self.cluster_id not in (None, 0):
+            return
+
+        tree_hash = self.command_tree_hash()
+        try:
+            with open(Config.COMMAND_HASH_FILE, encoding='utf-8') as handle:
+                last_sync = json.load(handle)
+        except (OSError, ValueError):
+            last_sync = {}
+
+        unchanged = last_sync == {'application_id': self.application_id, 'hash': tree_hash}
+        if unchanged and not (force or Config.FORCE_COMMAND_SYNC):
+            self.logger.info("Slash commands unchanged since last sync - skipping sync")
+            return
+
         try:
             synced = await self.tree.sync()
             self.logger.info(f"Synced {len(synced)} slash commands")
         except Exception as e:
             self.logger.error(f"Failed to sync slash commands: {e}")
-    
+            return
+
+        try:
+            os.makedirs(os.path.dirname(Config.COMMAND_HASH_FILE), exist_ok=True)
+            tmp_path = Config.COMMAND_HASH_FILE + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump({'application_id': self.application_id, 'hash': tree_hash}, handle)
+            os.replace(tmp_path, Config.COMMAND_HASH_FILE)
+        except OSError as e:
+            self.logger.error(f"Failed to save command tree hash: {e}")
+
     async def on_ready(self):
         """Event triggered when bot is ready."""
         self.logger.info(f'{self.user} has connected to Discord!')
         self.logger.info(f'Bot is in {len(self.guilds)} guilds')
+
+        # The shard count is only known once the gateway is connected
+        self.music_players.set_shard_count(self.shard_count)
+        self.setup_channels.set_shard_count(self.shard_count)
+        self.setup_views.set_shard_count(self.shard_count)
         
         # Set bot status
         await self.change_presence(
@@ -79,24 +183,176 @@ class MusicBot(commands.Bot):
                 name="music | /play"
             )
         )
+
+        # Load heavy libraries once, in the background
+        if self.warm_up_task is None:
+            self.startup.mark('gateway')
+            self.warm_up_task = asyncio.create_task(self.warm_up())
+
+        # on_ready can fire again after reconnects - only resume once
+        if not self._restores_started:
+            self._restores_started = True
+            asyncio.create_task(self.resume_playing_guilds())
+
+    async def warm_up(self):
+        """Load Opus and yt-dlp off the event loop so the first request does not pay for them."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, load_opus)
+            self.startup.mark('opus')
+            await loop.run_in_executor(None, get_yt_dlp)
+            self.startup.mark('yt_dlp')
+        except Exception as e:
+            self.logger.error(f"Warm-up failed: {e}")
+        self.startup.report()
+
+    async def resume_playing_guilds(self):
+        """Resume guilds that were playing before the restart, spread out over time."""
+        playing = [
+            (guild_id, state['channel_id'])
+            for guild_id, state in self.pending_restores.items()
+            if state['current'] and state['channel_id']
+        ]
+        for guild_id, channel_id in playing:
+            guild = self.get_guild(guild_id)
+            channel = guild.get_channel(channel_id) if guild else None
+            # Leave the queue for lazy restore if nobody is listening
+            if not channel or not any(not member.bot for member in channel.members):
+                continue
+
+            try:
+                music_player = self.get_music_player(guild_id)
+                await music_player.resume_from_journal(channel)
+                self.logger.info(f"Resumed playback for guild {guild_id}")
+            except Exception as e:
+                self.logger.error(f"Failed to resume guild {guild_id}: {e}")
+
+            # Spread stream resolution out instead of hitting the extractor at once
+            await asyncio.sleep(Config.QUEUE_RESTORE_STAGGER)
+
+    async def compact_queue_journals(self):
+        """Periodically checkpoint positions and compact large queue journals."""
+        while not self.is_closed():
+            await asyncio.sleep(Config.QUEUE_JOURNAL_COMPACT_INTERVAL)
+            for guild_id, music_player in list(self.music_players.items()):
+                try:
+                    if music_player.is_playing:
+                        self.queue_journal.record(
+                            guild_id, 'position', position=round(music_player.get_position(), 2)
+                        )
+                    if self.queue_journal.needs_compaction(guild_id):
+                        self.queue_journal.compact(guild_id, music_player.journal_state())
+                except Exception as e:
+                    self.logger.error(f"Queue journal compaction error for guild {guild_id}: {e}")
     
+    async def save_loudness_cache(self):
+        """Periodically write new loudness measurements to disk."""
+        while not self.is_closed():
+            await asyncio.sleep(Config.LOUDNESS_SAVE_INTERVAL)
+            await asyncio.get_running_loop().run_in_executor(None, self.loudness_cache.save)
+
+    async def refresh_memory_metrics(self):
+        """Periodically estimate memory use; scrapes serve the last estimate."""
+        while not self.is_closed():
+            try:
+                collect_memory_metrics(self)
+            except Exception as e:
+                self.logger.error(f"Failed to estimate memory use: {e}")
+            await asyncio.sleep(Config.MEMORY_METRICS_INTERVAL)
+
+    async def evict_idle_players(self):
+        """Periodically drop disconnected players that have had nothing to do for a while."""
+        while not self.is_closed():
+            await asyncio.sleep(Config.PLAYER_SWEEP_INTERVAL)
+            for guild_id, music_player in list(self.music_players.items()):
+                if music_player.is_idle(Config.PLAYER_IDLE_TIMEOUT):
+                    music_player.release()
+                    del self.music_players[guild_id]
+                    PLAYERS_EVICTED.inc(shard=shard_for_guild(guild_id, self.shard_count))
+
+    async def close(self):
+        """Shut down the bot and its audio workers."""
+        await self.deletions.flush(everything=True)
+        await super().close()
+        self.loudness_cache.save()
+        if self.queue_journal:
+            self.queue_journal.close()
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+        if self.audio_workers:
+            self.audio_workers.stop()
+
+    def restore_setup_panels(self):
+        """Register the stored setup channels and panel views of this process's guilds."""
+        panels = self.setup_store.load_all(owns=self.owns_guild)
+        for guild_id, panel in panels.items():
+            self.setup_channels[guild_id] = panel['channel_id']
+            view = SetupControlView(self, panel['channel_id'], guild_id, message_id=panel['message_id'])
+            self.add_view(view, message_id=panel['message_id'])
+            self.setup_views[guild_id] = view
+        if panels:
+            self.logger.info(f"Restored setup panels for {len(panels)} guilds")
+
+    async def save_setup_panel(self, view):
+        """Make a newly sent panel the guild's setup panel and persist it."""
+        self.setup_views[view.guild_id] = view
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.setup_store.save, view.guild_id, view.channel_id, view.message_id
+        )
+
+    def forget_setup_panel(self, view):
+        """Stop restoring a panel whose message was deleted."""
+        if self.setup_views.get(view.guild_id) is view:
+            del self.setup_views[view.guild_id]
+            self.setup_store.discard(view.guild_id)
+
+    def owns_guild(self, guild_id):
+        """Check whether a guild belongs to one of this process's shards."""
+        if self.shard_ids is None or not self.shard_count:
+            return True
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def get_cluster_load(self):
+        """Get a load summary for this process and its shards."""
+        voice_clients = sum(
+            1 for music_player in self.music_players.values()
+            if music_player.voice_client and music_player.voice_client.is_connected()
+        )
+        return {
+            'cluster_id': self.cluster_id,
+            'shards': list(self.shards),
+            'guilds': len(self.guilds),
+            'players': len(self.music_players),
+            'players_per_shard': self.music_players.shard_sizes(),
+            'voice_clients': voice_clients,
+            'latency_ms': None if math.isnan(self.latency) else round(self.latency * 1000)
+        }
+
+    async def report_cluster_load(self):
+        """Periodically send this cluster's load to the launcher process."""
+        await self.wait_until_ready()
+        while not self.is_closed():
+            try:
+                self.load_reports.put_nowait(self.get_cluster_load())
+            except Exception as e:
+                self.logger.error(f"Failed to report cluster load: {e}")
+            await asyncio.sleep(Config.CLUSTER_REPORT_INTERVAL)
+
     async def on_voice_state_update(self, member, before, after):
         """Handle voice state updates."""
         if member == self.user:
+            # The bot was disconnected without leaving on purpose
+            if before.channel and after.channel is None and member.guild.id in self.music_players:
+                self.music_players[member.guild.id].handle_voice_drop(before.channel)
             return
             
-        guild_id = member.guild.id
-        if guild_id not in self.music_players:
-            return
-            
-        voice_client = self.music_players[guild_id].voice_client
-        if not voice_client:
+        music_player = self.music_players.get(member.guild.id)
+        if not music_player or not music_player.voice_client:
             return
             
         # Check if bot is alone in voice channel
-        if len(voice_client.channel.members) == 1:
-            await self.music_players[guild_id].cleanup()
-            del self.music_players[guild_id]
+        if len(music_player.voice_client.channel.members) == 1:
+            await music_player.execute(music_player.disconnect_if_alone)
     
     async def on_message(self, message):
         """Handle messages."""
@@ -107,85 +363,89 @@ class MusicBot(commands.Bot):
         if message.guild.id in self.setup_channels and message.channel.id == self.setup_channels[message.guild.id]:
             # Check if user is in voice channel
             if not message.author.voice:
-                await message.reply("❌ You need to be in a voice channel to play music!", delete_after=5)
+                reply = await message.reply("❌ You need to be in a voice channel to play music!")
+                self.deletions.schedule(reply, 5)
                 return
             
             # Check if message contains a song request (not a command)
             content = message.content.strip()
             if not content.startswith('/') and not content.startswith('!') and len(content) > 0:
-                voice_channel = message.author.voice.channel
-                music_player = self.get_music_player(message.guild.id)
-                
-                # Show thinking status
-                thinking_msg = await message.reply("🎵 Konoha music is thinking...")
-                
-                # Connect to voice channel
-                if not await music_player.connect(voice_channel):
-                    await thinking_msg.edit(content="❌ Failed to connect to voice channel!")
-                    await asyncio.sleep(5)
-                    try:
-                        await message.delete()
-                        await thinking_msg.delete()
-                    except:
-                        pass
-                    return
-                
-                # Add to queue
-                song_info = await music_player.add_to_queue(content, message.author)
-                
-                # Delete thinking message
-                try:
-                    await thinking_msg.delete()
-                except:
-                    pass
-                if song_info:
-                    platform_emoji = {
-                        'youtube': '🎥',
-                        'spotify': '🎵',
-                        'soundcloud': '🔊'
-                    }.get(song_info.get('platform', 'youtube'), '🎵')
-
-                    embed = discord.Embed(
-                        title=f"{platform_emoji} Added to Queue",
-                        description=f"**[{song_info['title']}]({song_info.get('url', '')})**\nRequested by {message.author.mention}",
-                        color=discord.Color.green()
-                    )
-                    if song_info.get('duration'):
-                        embed.add_field(name="⏱️ Duration", value=format_duration(song_info['duration']), inline=True)
-                    if song_info.get('uploader'):
-                        embed.add_field(name="👤 Author", value=song_info['uploader'], inline=True)
-                    embed.add_field(name="🔗 Source", value=song_info.get('platform', 'youtube').title(), inline=True)
-                    if song_info.get('url'):
-                        embed.add_field(name="🎵 Watch", value=f"[Link]({song_info['url']})", inline=True)
-                    if song_info.get('thumbnail'):
-                        embed.set_thumbnail(url=song_info['thumbnail'])
-                    
-                    response_msg = await message.reply(embed=embed)
-                    
-                    # Delete messages after 3 seconds
-                    await asyncio.sleep(3)
-                    try:
-                        await message.delete()
-                        await response_msg.delete()
-                    except:
-                        pass
-                else:
-                    error_msg = await message.reply("❌ Failed to find or add the song to queue!")
-                    await asyncio.sleep(3)
-                    try:
-                        await message.delete()
-                        await error_msg.delete()
-                    except:
-                        pass
+                with trace('play', guild_id=message.guild.id, source='setup_channel', query=content):
+                    await self.handle_song_request(message, content)
                 return
-        
+
         # Process regular commands
         await self.process_commands(message)
     
+    async def handle_song_request(self, message, content):
+        """Queue a song typed into a setup channel."""
+        voice_channel = message.author.voice.channel
+        music_player = self.get_music_player(message.guild.id)
+        
+        # Show thinking status
+        thinking_msg = await message.reply("🎵 Konoha music is thinking...")
+        
+        # Connect to voice channel
+        if not await music_player.connect(voice_channel):
+            await thinking_msg.edit(content="❌ Failed to connect to voice channel!")
+            self.deletions.schedule(message, 5)
+            self.deletions.schedule(thinking_msg, 5)
+            return
+        
+        # Add to queue
+        song_info = await music_player.add_to_queue(content, message.author)
+        
+        # Delete thinking message
+        self.deletions.schedule(thinking_msg)
+        if song_info:
+            platform_emoji = {
+                'youtube': '🎥',
+                'spotify': '🎵',
+                'soundcloud': '🔊'
+            }.get(song_info.get('platform', 'youtube'), '🎵')
+
+            embed = discord.Embed(
+                title=f"{platform_emoji} Added to Queue",
+                description=f"**[{song_info['title']}]({song_info.get('url', '')})**\nRequested by {message.author.mention}",
+                color=discord.Color.green()
+            )
+            if song_info.get('duration'):
+                embed.add_field(name="⏱️ Duration", value=format_duration(song_info['duration']), inline=True)
+            if song_info.get('uploader'):
+                embed.add_field(name="👤 Author", value=song_info['uploader'], inline=True)
+            embed.add_field(name="🔗 Source", value=song_info.get('platform', 'youtube').title(), inline=True)
+            if song_info.get('url'):
+                embed.add_field(name="🎵 Watch", value=f"[Link]({song_info['url']})", inline=True)
+            if song_info.get('thumbnail'):
+                embed.set_thumbnail(url=song_info['thumbnail'])
+            
+            response_msg = await message.reply(embed=embed)
+        else:
+            response_msg = await message.reply("❌ Failed to find or add the song to queue!")
+
+        # Delete the request and the reply after 3 seconds
+        self.deletions.schedule(message, 3)
+        self.deletions.schedule(response_msg, 3)
+
+    def peek_music_player(self, guild_id):
+        """Get a guild's music player without creating one, or None if the guild has none."""
+        if guild_id in self.pending_restores:
+            return self.get_music_player(guild_id)  # A saved queue is waiting to be rebuilt
+        return self.music_players.get(guild_id)
+
     def get_music_player(self, guild_id):
         """Get or create music player for guild."""
         if guild_id not in self.music_players:
-            self.music_players[guild_id] = MusicPlayer(self, guild_id)
+            music_player = MusicPlayer(self, guild_id)
+            self.music_players[guild_id] = music_player
+            # Lazily rebuild a queue saved before the last restart
+            state = self.pending_restores.pop(guild_id, None)
+            if state:
+                music_player.restore_state(state)
+            # Keep a panel restored on startup in sync with the new player
+            view = self.setup_views.get(guild_id)
+            if view:
+                music_player.register_setup_panel(view)
         return self.music_players[guild_id]
     
     async def on_command_error(self, ctx, error):
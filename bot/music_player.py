@@ -1,10 +1,45 @@
 import discord
 import asyncio
+import functools
+import inspect
 import logging
+import math
+import time
+from collections import deque
 from .queue_manager import QueueManager
+from .queue_journal import serialize_song, deserialize_song
 from .utils import YTDLSource
+from .crossfade import CrossfadeSource
+from .loudness import LoudnessMeter, track_key
+from .stream_watchdog import pick_fallback_format, stream_failure
+from .tracing import current_span, span
+from .startup import load_opus
+from .metrics import (
+    SEARCH_SECONDS, RESOLVE_SECONDS, FIRST_AUDIO_SECONDS,
+    PANEL_SYNC_SECONDS, REST_EDITS, HISTORY_HITS, STREAM_FORMATS, STREAM_RECOVERIES, labels_for
+)
 from config import Config
 
+
+class MusicVoiceClient(discord.VoiceClient):
+    """VoiceClient that remembers whether Discord removed it from its channel.
+
+    discord.py expects a channel-less voice state after its own disconnects
+    (including the ones in its reconnect flow). Any other one means somebody
+    disconnected the bot, which is seen here before the voice_state_update event.
+    """
+
+    externally_disconnected = False
+
+    async def on_voice_state_update(self, data):
+        # VoiceConnectionState._expecting_disconnect is private (checked against discord.py 2.7.1).
+        # Without it every drop counts as expected, so the bot rejoins as it did before.
+        expecting = getattr(getattr(self, '_connection', None), '_expecting_disconnect', True)
+        if data['channel_id'] is None and not expecting:
+            self.externally_disconnected = True
+        await super().on_voice_state_update(data)
+
+
 class MusicPlayer:
     """Music player for a specific guild."""
 
@@ -12,30 +47,86 @@ class MusicPlayer:
         self.bot = bot
         self.guild_id = guild_id
         self.voice_client = None
-        self.queue = QueueManager()
+        self.queue = QueueManager(bot.queue_journal, guild_id)
         self.current_song = None
         self.is_playing = False
         self.is_paused = False
         self.loop_mode = "off"  # "off", "current", "queue"
         self.volume = 1.0
-        self.previous_songs = []  # Store previous songs for previous command
+        self.normalize = Config.NORMALIZE_DEFAULT  # Loudness normalization for this guild
+        self.previous_songs = deque(maxlen=Config.PLAY_HISTORY_SIZE)  # Store previous songs for previous command
         self.logger = logging.getLogger(__name__)
         self.cleanup_task = None
         self.setup_panels = []  # Store setup panel references
         self.sync_task = None  # Continuous sync task
         self.last_sync_state = None  # Track last known state
+        self.prefetched = None  # (song_info, source) spawned ahead of time for the next song
+        self.prefetch_task = None
+        self.opening = None  # Opens the current song's stream outside the mailbox
+        self.mixer = None  # CrossfadeSource of the current song when crossfading is on
+        self.stream_source = None  # Current song's source without the crossfade wrapper, followed across seeks
+        self.watch_task = None  # Stream watchdog of the current song
+        self.recovery = None  # Recovery attempts and failed formats of the current song
+        self.resume_point = None  # Song, position and extracted info to resume after a voice drop
+        self.reconnecting = False
+        self.reconnect_task = None
+        self.disconnecting = False
+        self.mailbox = asyncio.Queue()  # (func, args, kwargs, future) waiting for the actor task
+        self.actor_task = None  # Runs mailbox calls one at a time; exits when the mailbox is empty
+        self.idle_task = None  # Disconnects after the queue has been empty for a while
+        self.sync_lock = asyncio.Lock()
+        self.last_active = time.monotonic()  # Last state-changing call, for the idle player sweeper
+
+    async def execute(self, func, *args, **kwargs):
+        """Run a state-changing call on this guild's actor, after every call queued before it.
+
+        Calls made from inside the actor run directly.
+        """
+        self.last_active = time.monotonic()
+        if self.actor_task is not None and asyncio.current_task() is self.actor_task:
+            result = func(*args, **kwargs)
+            return await result if inspect.isawaitable(result) else result
+
+        future = asyncio.get_running_loop().create_future()
+        self.mailbox.put_nowait((func, args, kwargs, future))
+        if self.actor_task is None or self.actor_task.done():
+            self.actor_task = asyncio.create_task(self._run_actor())
+        return await future
+
+    async def _run_actor(self):
+        """Process mailbox calls one at a time."""
+        # Each call brings its own trace parent; do not inherit the span of whoever started the actor
+        current_span.set(None)
+        while not self.mailbox.empty():
+            func, args, kwargs, future = self.mailbox.get_nowait()
+            if future.cancelled():
+                continue  # The caller gave up waiting
+            try:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
 
     async def connect(self, channel):
         """Connect to voice channel."""
         try:
-            if self.voice_client is None:
-                self.voice_client = await channel.connect()
-                # Self deafen the bot when joining
-                await self.voice_client.guild.me.edit(deafen=True, mute=False)
-            elif self.voice_client.channel != channel:
-                await self.voice_client.move_to(channel)
-                # Self deafen the bot when moving
-                await self.voice_client.guild.me.edit(deafen=True, mute=False)
+            with span('connect', channel_id=channel.id):
+                # A request can arrive before the warm-up task has loaded Opus
+                if not discord.opus.is_loaded():
+                    await asyncio.get_running_loop().run_in_executor(None, load_opus)
+                if self.voice_client is None:
+                    self.voice_client = await channel.connect(cls=MusicVoiceClient)
+                    # Self deafen the bot when joining
+                    await self.voice_client.guild.me.edit(deafen=True, mute=False)
+                elif self.voice_client.channel != channel:
+                    await self.voice_client.move_to(channel)
+                    # Self deafen the bot when moving
+                    await self.voice_client.guild.me.edit(deafen=True, mute=False)
             return True
         except Exception as e:
             self.logger.error(f"Failed to connect to voice channel: {e}")
@@ -44,8 +135,12 @@ class MusicPlayer:
     async def disconnect(self):
         """Disconnect from voice channel."""
         if self.voice_client:
-            await self.voice_client.disconnect()
-            self.voice_client = None
+            self.disconnecting = True
+            try:
+                await self.voice_client.disconnect()
+            finally:
+                self.voice_client = None
+                self.disconnecting = False
 
     async def play_next(self):
         """Play next song in queue."""
@@ -57,55 +152,171 @@ class MusicPlayer:
             # Loop queue - add current song to end of queue
             self.queue.add(self.current_song)
         elif self.loop_mode == "off" and self.current_song:
-            # No loop - add to previous songs
+            # No loop - add to previous songs (the oldest drop off the deque)
             self.previous_songs.append(self.current_song)
-            # Keep only last 10 previous songs
-            if len(self.previous_songs) > 10:
-                self.previous_songs.pop(0)
 
         if self.queue.is_empty():
             self.is_playing = False
             self.current_song = None
+            self._record('current', song=None)
             # Set status when queue is empty
-            await self.update_channel_status("Konoha Music was here")
-            # Auto-disconnect after queue ends
-            await asyncio.sleep(10)  # Wait 10 seconds before disconnecting
-            if self.queue.is_empty() and not self.is_playing:
-                await self.cleanup()
-                if self.guild_id in self.bot.music_players:
-                    del self.bot.music_players[self.guild_id]
-                self.logger.info("Auto-disconnected due to empty queue")
+            asyncio.create_task(self.update_channel_status("Konoha Music was here"))
+            # Auto-disconnect after queue ends, without holding up the mailbox meanwhile
+            if self.idle_task is None or self.idle_task.done():
+                self.idle_task = asyncio.create_task(self._disconnect_when_idle())
             return
 
         next_song = self.queue.get_next()
         await self.play_song(next_song)
 
-    async def play_song(self, song_info):
-        """Play a specific song."""
+    async def play_song(self, song_info, record=True):
+        """Make a song current and start opening its stream.
+
+        The stream is opened in ``self.opening`` outside the mailbox, so commands are not
+        held up by extraction; playback then starts through the mailbox.
+        ``record=False`` restarts a song that was already playing (stream recovery, voice
+        reconnect) without counting it again in the title index and play history.
+        """
+        if not self.voice_client:
+            self.logger.error("No voice client available")
+            return
+
+        # Use the source spawned ahead of time for this song, if any
+        start_at = song_info.pop('start_at', 0.0)  # Saved position of a resumed song
+        resolved = song_info.pop('resolved', None)  # Extracted info kept across a reconnect
+        if start_at or resolved:
+            # A resumed song reopens its own stream; a prefetch made for the next song stays usable
+            if self.prefetched and self.prefetched[0] is song_info:
+                self.discard_prefetch(cancel=False)
+            source = None
+        else:
+            source = self._take_prefetched(song_info)
+
+        # Commands see the song as current while its stream opens
+        self.cancel_opening()
+        self.current_song = song_info
+        self.is_playing = True
+        self.is_paused = False
+        self.opening = asyncio.create_task(self._open_and_play(song_info, source, start_at, resolved, record))
+
+    def cancel_opening(self):
+        """Stop opening the current song's stream; returns True if one was being opened."""
+        opening, self.opening = self.opening, None
+        if opening is None or opening.done():
+            return False
+        opening.cancel()
+        return True
+
+    async def _open_and_play(self, song_info, source, start_at, resolved, record):
+        # Continue the trace of the request that started this song, if any
+        with span('play_song', parent=song_info.pop('trace_parent', None), title=song_info.get('title')) as play_span:
+            opening = asyncio.current_task()
+            bitrate = self._channel_bitrate()
+            try:
+                if source is None:
+                    started = time.perf_counter()
+                    with span('create_source'):
+                        source = await self._open_source(song_info, start_at, resolved, bitrate)
+                    RESOLVE_SECONDS.observe(time.perf_counter() - started, **self._metric_labels())
+            except Exception as e:
+                self.logger.error(f"Error opening stream for {song_info['title']}: {e}")
+                source = None
+            await self.execute(self._start_playback, opening, song_info, source, play_span, start_at, bitrate, record)
+
+    async def _open_source(self, song_info, start_at, resolved, bitrate):
+        """Open a song's stream in the background, cleaning it up if the song is abandoned meanwhile."""
+        if resolved:
+            future = asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                YTDLSource.open_stream, resolved,
+                volume=self.volume, audio_workers=self.bot.audio_workers,
+                position=start_at, bitrate=bitrate
+            ))
+        else:
+            future = asyncio.ensure_future(YTDLSource.create_source(
+                song_info['url'],
+                volume=self.volume,
+                audio_workers=self.bot.audio_workers,
+                position=start_at,
+                bitrate=bitrate
+            ))
         try:
-            if not self.voice_client:
-                self.logger.error("No voice client available")
-                return
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            def cleanup(done):
+                if not done.cancelled() and done.exception() is None and done.result():
+                    self._cleanup_source(done.result())
+            future.add_done_callback(cleanup)
+            raise
 
-            # Create audio source
-            source = await YTDLSource.create_source(song_info['url'], volume=self.volume)
+    async def _start_playback(self, opening, song_info, source, play_span, start_at, bitrate, record):
+        """Start an opened stream, unless the song was skipped or stopped while it opened."""
+        if self.opening is not opening:
+            if source:
+                self._cleanup_source(source)
+            return
+        self.opening = None
+        try:
             if not source:
                 self.logger.error(f"Failed to create audio source for {song_info['title']}")
+                # The song never started - do not loop it or add it to the history
+                self.current_song = None
                 await self.play_next()
                 return
+            self._record_format(source, bitrate)
 
             # Set volume
             if hasattr(source, 'volume'):
                 source.volume = self.volume
 
+            # Apply the cached loudness gain, or measure this play
+            self._apply_normalization(source, song_info)
+            meter = getattr(source, 'meter', None)
+
+            # Measure request-to-first-packet for songs that started right away
+            requested_at = song_info.pop('requested_at', None)
+            first_frame_span = play_span.child('first_audio_frame') if play_span else None
+            if requested_at or first_frame_span:
+                labels = self._metric_labels()
+
+                def on_first_frame():
+                    # Runs in the audio player thread
+                    if requested_at:
+                        FIRST_AUDIO_SECONDS.observe(time.perf_counter() - requested_at, **labels)
+                    if first_frame_span:
+                        first_frame_span.end()
+
+                source.on_first_frame = on_first_frame
+
+            # Fade in over the end of the previous song
+            self.stream_source = source
+            source = self._wrap_crossfade(source, song_info)
+
             def after_playing(error):
                 if error:
                     self.logger.error(f"Player error: {error}")
                 else:
                     self.logger.info(f"Finished playing: {song_info['title']}")
 
-                # Schedule next song
-                coro = self.play_next()
+                # Cache the loudness measured during this play
+                if meter:
+                    self.bot.loop.call_soon_threadsafe(self.bot.loudness_cache.store, track_key(song_info), meter)
+
+                # reconnect() replaced this connection and resumes the song itself
+                if self.reconnecting or self.voice_client is not voice_client:
+                    return
+                # Playback stopped because the voice connection went away - keep the song for reconnect()
+                if self._connection_lost():
+                    self.resume_point = self._resume_point(song_info, self.stream_source)
+                    self.logger.warning(f"Voice connection lost during {song_info['title']}")
+                    return
+
+                # Reopen a stream that stalled or broke off before its end, otherwise schedule next song
+                stream = self.stream_source
+                failure = stream_failure(stream, song_info, error)
+                if failure:
+                    coro = self.execute(self.recover_stream, song_info, stream, failure)
+                else:
+                    coro = self.execute(self.play_next)
                 future = asyncio.run_coroutine_threadsafe(coro, self.bot.loop)
                 try:
                     future.result()
@@ -113,14 +324,30 @@ class MusicPlayer:
                     self.logger.error(f"Error in after_playing: {e}")
 
             # Play audio
-            self.voice_client.play(source, after=after_playing)
+            voice_client = self.voice_client
+            self.voice_client.play(source, after=after_playing, bitrate=bitrate or 128)
+            if record:
+                self.bot.title_index.record_play(song_info)
+                self.bot.play_history.record(self.guild_id, song_info, song_info.get('query'))
 
-            self.current_song = song_info
-            self.is_playing = True
-            self.is_paused = False
+            self._record(
+                'current',
+                song=serialize_song(song_info),
+                position=start_at,
+                channel_id=self.voice_client.channel.id
+            )
+
+            # Get the next song's pipeline ready before this one ends
+            if Config.PREFETCH_ENABLED:
+                self.prefetch_task = asyncio.create_task(self._prefetch_next(song_info))
+
+            # Watch the stream so a stall is recovered instead of going silent
+            if self.watch_task and not self.watch_task.done():
+                self.watch_task.cancel()
+            self.watch_task = asyncio.create_task(self._watch_stream(song_info))
 
-            # Update channel status with now playing
-            await self.update_channel_status(f"Now Playing: {song_info['title']}")
+            # Update channel status with now playing, without holding up the mailbox
+            asyncio.create_task(self.update_channel_status(f"Now Playing: {song_info['title']}"))
 
             self.logger.info(f"Now playing: {song_info['title']}")
 
@@ -128,32 +355,457 @@ class MusicPlayer:
             self.logger.error(f"Error playing song: {e}")
             import traceback
             self.logger.error(traceback.format_exc())
+            self.current_song = None
+            await self.play_next()
+
+    async def _disconnect_when_idle(self):
+        await asyncio.sleep(10)  # Wait 10 seconds before disconnecting
+        await self.execute(self._disconnect_if_idle)
+
+    async def _disconnect_if_idle(self):
+        if self.queue.is_empty() and not self.is_playing:
+            await self.cleanup()
+            self.detach()
+            self.logger.info("Auto-disconnected due to empty queue")
+
+    async def disconnect_if_alone(self):
+        """Leave the voice channel once nobody else is in it."""
+        if self.voice_client and self.voice_client.channel and len(self.voice_client.channel.members) == 1:
+            await self.cleanup()
+            self.detach()
+            self.logger.info("Auto-disconnected, alone in voice channel")
+
+    def _upcoming_song(self):
+        """Get the song play_next would start after the current one."""
+        if self.loop_mode == "current":
+            return self.current_song
+        if not self.queue.is_empty():
+            return self.queue.peek()
+        if self.loop_mode == "queue":
+            return self.current_song
+        return None
+
+    async def _prefetch_next(self, song_info):
+        """Spawn and pre-buffer the next song's source shortly before the current song ends."""
+        duration = song_info.get('duration')
+        if not duration:
+            return  # Live streams have no known end
+
+        # Poll the position so pauses and seeks are taken into account,
+        # and keep waiting near the end in case a song is queued late
+        while True:
+            if self.current_song is not song_info:
+                return
+            lead = max(Config.PREFETCH_LEAD_SECONDS, Config.CROSSFADE_SECONDS + 2)
+            remaining = duration - self.get_position() - lead
+            upcoming = self._upcoming_song() if remaining <= 0 else None
+            if upcoming is not None:
+                break
+            await asyncio.sleep(min(remaining, 5) if remaining > 0 else 1)
+
+        if self.prefetched and self.prefetched[0] is upcoming:
+            return
+
+        try:
+            source = await YTDLSource.create_source(
+                upcoming['url'],
+                volume=self.volume,
+                audio_workers=self.bot.audio_workers,
+                bitrate=self._channel_bitrate()
+            )
+            if source and hasattr(source, 'prebuffer'):
+                await asyncio.get_running_loop().run_in_executor(
+                    None, source.prebuffer, Config.PREFETCH_BUFFER_FRAMES
+                )
+        except Exception as e:
+            self.logger.error(f"Failed to prefetch {upcoming['title']}: {e}")
+            return
+        if not source:
+            return
+
+        # Throw the source away if the queue changed while it was starting
+        if self.current_song is not song_info or self._upcoming_song() is not upcoming:
+            self._cleanup_source(source)
+            return
+        self.discard_prefetch(cancel=False)
+        self.prefetched = (upcoming, source)
+        self.logger.info(f"Prefetched next song: {upcoming['title']}")
+
+    def _take_prefetched(self, song_info):
+        """Get the prefetched source if it was made for this song; discard it otherwise."""
+        if self.prefetched is None:
+            return None
+        song, source = self.prefetched
+        self.prefetched = None
+        if song is song_info:
+            return source
+        self._cleanup_source(source)
+        return None
+
+    def _cleanup_source(self, source):
+        """Clean up a source that is not playing without blocking the event loop."""
+        # Killing FFmpeg or closing a worker stream can block
+        asyncio.get_running_loop().run_in_executor(None, source.cleanup)
+
+    async def _watch_stream(self, song_info):
+        """Cut a stream that stops delivering audio, so after_playing recovers it."""
+        interval = Config.STREAM_CHECK_INTERVAL
+        watched, last_frames, starved = None, 0, 0.0
+        while self.current_song is song_info:
+            await asyncio.sleep(interval)
+            source = self.stream_source
+            frames = getattr(source, 'frames', 0)
+            if source is not watched or frames < last_frames:
+                # A new stream or a seek - start measuring again
+                watched, last_frames, starved = source, frames, 0.0
+                continue
+            if self.is_paused or not self.voice_client or not self.voice_client.is_playing():
+                last_frames, starved = frames, 0.0
+                continue
+
+            # Throughput as a fraction of real time (50 frames per second)
+            delivered = (frames - last_frames) / (interval * 50)
+            last_frames = frames
+            if delivered >= Config.STREAM_MIN_THROUGHPUT:
+                starved = 0.0
+                continue
+            starved += interval
+
+            # Errors on ffmpeg's stderr mean it is not going to catch up by itself
+            monitor = getattr(source, 'stderr_monitor', None)
+            failing = monitor is not None and monitor.errors > 0
+            if starved < (interval * 2 if failing else Config.STREAM_STALL_TIMEOUT):
+                continue
+            self.logger.warning(
+                f"Stream of {song_info['title']} stalled at {frames * 0.02:.1f}s "
+                f"({delivered:.0%} of real time for {starved:.0f}s)"
+                + (f": {monitor.last_error}" if failing else "")
+            )
+            source.stalled = True
+            await asyncio.get_running_loop().run_in_executor(None, source.cleanup)
+            return
+
+    async def recover_stream(self, song_info, source, reason):
+        """Reopen a stalled or broken stream where it stopped, switching formats if it keeps failing."""
+        if self.current_song is not song_info:
+            return  # Stopped meanwhile
+        recovery = self.recovery
+        if recovery is None or recovery['song'] is not song_info:
+            recovery = self.recovery = {'song': song_info, 'attempts': 0, 'failed_formats': set()}
+        recovery['attempts'] += 1
+        data = getattr(source, 'data', None) or {}
+        if data.get('format_id'):
+            recovery['failed_formats'].add(data['format_id'])
+
+        if recovery['attempts'] > Config.STREAM_MAX_RECOVERIES:
+            self.logger.error(f"Giving up on {song_info['title']} after {Config.STREAM_MAX_RECOVERIES} stream recoveries")
             await self.play_next()
+            return
+
+        STREAM_RECOVERIES.inc(reason=reason, **self._metric_labels())
+        position = getattr(source, 'frames', 0) * 0.02
+        song_info['start_at'] = position
+        format_id = "re-resolved"
+        if recovery['attempts'] > 1:
+            # A freshly resolved stream failed too - fall back to another stored format
+            bitrate = self._channel_bitrate()
+            fallback = pick_fallback_format(
+                data.get('formats') or [], recovery['failed_formats'],
+                max_abr=bitrate * Config.FORMAT_BITRATE_HEADROOM if bitrate else None
+            )
+            if fallback:
+                song_info['resolved'] = dict(data, url=fallback['url'], format_id=fallback['format_id'])
+                format_id = f"format {fallback['format_id']}"
+        error = getattr(source, 'last_error', None) or getattr(getattr(source, 'stderr_monitor', None), 'last_error', None)
+        self.logger.warning(
+            f"Recovering {song_info['title']} at {position:.1f}s after {reason} "
+            f"(attempt {recovery['attempts']}, {format_id})" + (f": {error}" if error else "")
+        )
+        await self.play_song(song_info, record=False)
+
+    def _channel_bitrate(self):
+        """Get the voice channel bitrate in kbps that streams are matched to, or None."""
+        channel = self.voice_client.channel if self.voice_client else None
+        if not Config.MATCH_CHANNEL_BITRATE or not getattr(channel, 'bitrate', None):
+            return None
+        # Opus encodes 16 to 512 kbps
+        return max(16, min(512, channel.bitrate // 1000))
+
+    def _record_format(self, source, bitrate):
+        """Count the stream format chosen for a channel bitrate."""
+        data = getattr(source, 'data', None) or {}
+        STREAM_FORMATS.inc(
+            shard=self._metric_labels()['shard'],
+            channel_kbps=str(bitrate or "unmatched"),
+            format=str(data.get('format_id') or "unknown"),
+            codec=str(data.get('acodec') or "unknown")
+        )
+
+    def _connection_lost(self):
+        return (
+            not self.disconnecting
+            and self.voice_client is not None
+            and not self.voice_client.is_connected()
+        )
+
+    def _resume_point(self, song_info, source):
+        """Remember where a song was and the stream it was playing."""
+        return {
+            'song': song_info,
+            'position': getattr(source, 'frames', 0) * 0.02,
+            'data': getattr(source, 'data', None)
+        }
+
+    def handle_voice_drop(self, channel):
+        """React to the bot leaving a voice channel it did not leave on purpose."""
+        if self.voice_client is None or self.disconnecting:
+            return
+        if self.reconnect_task and not self.reconnect_task.done():
+            return
+        if getattr(self.voice_client, 'externally_disconnected', False):
+            # Somebody disconnected the bot - stop instead of rejoining
+            self.reconnect_task = asyncio.create_task(self._stop_after_external_disconnect())
+            return
+        self.reconnect_task = asyncio.create_task(self._reconnect_after_drop(channel))
+
+    async def _stop_after_external_disconnect(self):
+        self.logger.info("Disconnected from voice by someone else - stopping")
+        await self.execute(self.cleanup)
+        self.detach()
+
+    async def _reconnect_after_drop(self, channel):
+        # discord.py runs its own reconnect first - only take over once it has given up
+        if await self._library_reconnected():
+            return
+        if self.voice_client is None or self.voice_client.is_connected():
+            return
+        if not any(not member.bot for member in channel.members):
+            self.logger.info("Voice connection dropped and nobody is listening - not reconnecting")
+            await self.execute(self._keep_resume_point)
+            self.voice_client = None
+            return
+        await self.reconnect(channel)
+
+    async def _library_reconnected(self):
+        """Wait for discord.py's own reconnect; returns True if the connection came back."""
+        voice_client = self.voice_client
+        deadline = time.monotonic() + Config.VOICE_LIBRARY_RECONNECT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+            if self.voice_client is not voice_client:
+                return True  # Replaced or cleaned up meanwhile; nothing left to do here
+            if voice_client.is_connected():
+                self.logger.info("Voice connection restored by discord.py")
+                return True
+            if voice_client.guild.voice_client is not voice_client:
+                return False  # discord.py gave up and dropped the client
+        return False
+
+    async def reconnect(self, channel):
+        """Reconnect to voice with backoff and resume the current song where it stopped."""
+        self.reconnecting = True
+        try:
+            source = self.voice_client.source if self.voice_client else None
+            if self.resume_point is None and self.current_song and source is not None:
+                self.resume_point = self._resume_point(self.current_song, source)
+
+            # Drop the old connection so connect() makes a new one
+            if self.voice_client:
+                try:
+                    await self.voice_client.disconnect(force=True)
+                except Exception as e:
+                    self.logger.error(f"Failed to close voice connection: {e}")
+                self.voice_client = None
+
+            delay = Config.VOICE_RECONNECT_BASE_DELAY
+            for attempt in range(1, Config.VOICE_RECONNECT_ATTEMPTS + 1):
+                if await self.connect(channel):
+                    break
+                if attempt == Config.VOICE_RECONNECT_ATTEMPTS:
+                    self.logger.error(f"Giving up on voice reconnect after {attempt} attempts")
+                    await self.execute(self._keep_resume_point)
+                    return False
+                self.logger.warning(f"Voice reconnect attempt {attempt} failed, retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, Config.VOICE_RECONNECT_MAX_DELAY)
+        finally:
+            self.reconnecting = False
+
+        point, self.resume_point = self.resume_point, None
+        if point:
+            # Resume from the saved position with the stream that was already extracted
+            song = point['song']
+            song['start_at'] = point['position']
+            if point['data']:
+                song['resolved'] = point['data']
+            self.logger.info(f"Resuming {song['title']} at {point['position']:.1f}s after reconnect")
+            await self.execute(self.play_song, song, record=False)
+        elif not self.is_playing and not self.queue.is_empty():
+            await self.execute(self.play_next)
+        return True
+
+    def _keep_resume_point(self):
+        """Put the interrupted song back at the front of the queue for the next connect."""
+        point, self.resume_point = self.resume_point, None
+        self.is_playing = False
+        self.is_paused = False
+        self.current_song = None
+        if point:
+            song = point['song']
+            song['start_at'] = point['position']
+            self.queue.add_to_front(song)
+
+    async def seek(self, position):
+        """Restart the current song at a position in seconds, reusing its resolved stream URL."""
+        source = self.voice_client.source if self.voice_client else None
+        if source is None or not self.current_song or not math.isfinite(position):
+            return False
+        duration = self.current_song.get('duration')
+        position = max(0.0, min(position, duration - 1) if duration else position)
+
+        inner = source.source if isinstance(source, CrossfadeSource) else source
+        if hasattr(inner, 'seek'):
+            # Audio workers restart their own pipeline
+            inner.seek(position)
+        elif isinstance(inner, YTDLSource):
+            replacement = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                YTDLSource.from_stream, inner.url, data=inner.data, volume=inner.volume, position=position
+            ))
+            replacement.gain = inner.gain
+            replacement.meter = inner.meter
+            self.stream_source = replacement
+            if isinstance(source, CrossfadeSource):
+                self._retire_sources(*source.replace(replacement))
+            else:
+                self.voice_client.source = replacement
+                self._retire_sources(inner)
+                # Swapping the source resumes the player
+                if self.is_paused:
+                    self.voice_client.pause()
+        else:
+            return False
+
+        self._record('position', position=round(position, 2))
+        self.logger.info(f"Seeked to {position:.1f}s in {self.current_song['title']}")
+        return True
+
+    async def rewind(self):
+        """Restart the current song, resolving it again only if its source cannot seek."""
+        if await self.seek(0):
+            return
+        if self.opening and not self.opening.done():
+            return  # Still opening, so it starts from the beginning anyway
+        if self.voice_client and self.voice_client.is_playing():
+            self.voice_client.stop()
+        self.queue.add_to_front(self.current_song)
+
+    def _retire_sources(self, *sources):
+        """Clean up replaced sources once the audio player thread has moved off them."""
+        loop = asyncio.get_running_loop()
+
+        def cleanup():
+            for old in sources:
+                if old is not None:
+                    loop.run_in_executor(None, old.cleanup)
+
+        loop.call_later(1, cleanup)
+
+    def _apply_normalization(self, source, song_info):
+        """Set a source's loudness gain from the cache, measuring tracks that were never measured."""
+        if not hasattr(source, 'gain'):
+            return
+        gain = self.bot.loudness_cache.gain(track_key(song_info)) if self.normalize else None
+        source.gain = gain or 1.0
+        if self.normalize and gain is None and hasattr(source, 'meter'):
+            source.meter = LoudnessMeter()
+
+    def set_normalize(self, enabled):
+        """Turn loudness normalization on or off, updating the current song right away."""
+        self.normalize = enabled
+        source = self.voice_client.source if self.voice_client else None
+        if source is not None and self.current_song and hasattr(source, 'gain'):
+            gain = self.bot.loudness_cache.gain(track_key(self.current_song)) if enabled else None
+            source.gain = gain or 1.0
+
+    def _wrap_crossfade(self, source, song_info):
+        """Wrap a PCM source so it fades in over the previous song's handed-over tail."""
+        outgoing = self.mixer.detach() if self.mixer and self.mixer.handed_over else None
+        self.mixer = None
+        if not Config.CROSSFADE_SECONDS or source.is_opus():
+            if outgoing:
+                self._cleanup_source(outgoing)
+            return source
+
+        duration = song_info.get('duration')
+        self.mixer = CrossfadeSource(
+            source,
+            fade_frames=int(Config.CROSSFADE_SECONDS * 50),
+            outgoing=outgoing,
+            end_at=int((duration - Config.CROSSFADE_SECONDS) * 50) if duration else None,
+            ready=lambda: self._crossfade_ready(song_info)
+        )
+        return self.mixer
+
+    def _crossfade_ready(self, song_info):
+        """Check whether the next song's source is prefetched so this song can end early."""
+        # Called from the audio player thread
+        prefetched = self.prefetched
+        return (
+            self.current_song is song_info
+            and prefetched is not None
+            and prefetched[0] is self._upcoming_song()
+            and not prefetched[1].is_opus()
+        )
+
+    def discard_prefetch(self, cancel=True):
+        """Stop any prefetch in progress and clean up a prefetched source."""
+        if cancel and self.prefetch_task and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        if self.prefetched:
+            self._cleanup_source(self.prefetched[1])
+            self.prefetched = None
 
     async def add_to_queue(self, query, requester):
         """Add song to queue."""
         try:
-            song_info = await YTDLSource.search(query)
+            requested_at = time.perf_counter()
+            # Songs this guild played recently resolve without yt-dlp
+            song_info = self.bot.play_history.lookup(self.guild_id, query)
+            if song_info:
+                HISTORY_HITS.inc(**self._metric_labels())
+            else:
+                with span('search', query=query):
+                    song_info = await YTDLSource.search(query)
+                SEARCH_SECONDS.observe(time.perf_counter() - requested_at, **self._metric_labels())
             if not song_info:
                 return None
+            self.bot.title_index.add(song_info)
+            song_info['query'] = query
 
             song_info['requester'] = requester
-            self.queue.add(song_info)
-
-            # If nothing is playing, start playing
-            if not self.is_playing:
-                await self.play_next()
-
+            await self.execute(self._enqueue, song_info, requested_at, current_span.get())
             return song_info
         except Exception as e:
             self.logger.error(f"Error adding to queue: {e}")
             return None
 
+    async def _enqueue(self, song_info, requested_at, trace_parent):
+        self.queue.add(song_info)
+
+        # If nothing is playing, start playing
+        if not self.is_playing:
+            song_info['requested_at'] = requested_at
+            song_info['trace_parent'] = trace_parent
+            await self.play_next()
+
     def pause(self):
         """Pause playback."""
         if self.voice_client and self.voice_client.is_playing():
             self.voice_client.pause()
             self.is_paused = True
+            # Let an audio worker stop decoding while paused
+            if hasattr(self.voice_client.source, 'pause'):
+                self.voice_client.source.pause()
             # Update status to show paused state
             if self.current_song:
                 asyncio.create_task(self.update_channel_status(f"⏸️ Paused: {self.current_song['title']}"))
@@ -161,6 +813,8 @@ class MusicPlayer:
     def resume(self):
         """Resume playback."""
         if self.voice_client and self.voice_client.is_paused():
+            if hasattr(self.voice_client.source, 'resume'):
+                self.voice_client.source.resume()
             self.voice_client.resume()
             self.is_paused = False
             # Update status back to now playing
@@ -169,14 +823,47 @@ class MusicPlayer:
 
     def stop(self):
         """Stop playback."""
+        self.cancel_opening()
         if self.voice_client and self.voice_client.is_playing():
             self.voice_client.stop()
+        self.discard_prefetch()
+        if self.mixer and self.mixer.handed_over:
+            self._cleanup_source(self.mixer.detach())
+        self.mixer = None
         self.is_playing = False
         self.is_paused = False
+        if self.current_song:
+            self._record('current', song=None)
         self.current_song = None
         # Set status when stopped
         asyncio.create_task(self.update_channel_status("Konoha Music was here"))
 
+    def stop_and_clear(self):
+        """Stop playback and clear the queue in one step, so no next song starts in between."""
+        self.stop()
+        self.clear_queue()
+
+    async def previous(self):
+        """Go back to the previous song, putting the current one back at the front of the queue.
+
+        Returns False when there is no previous song.
+        """
+        if not self.previous_songs:
+            return False
+        prev_song = self.previous_songs.pop()
+
+        # The current song is requeued here, so play_next must not loop it or add it to the history
+        current, self.current_song = self.current_song, None
+        if current:
+            self.queue.add_to_front(current)
+        self.queue.add_to_front(prev_song)
+
+        if self.voice_client and (self.voice_client.is_playing() or self.voice_client.is_paused()):
+            self.voice_client.stop()  # after_playing starts the previous song
+        elif self.voice_client:
+            await self.play_next()
+        return True
+
     def register_setup_panel(self, panel):
         """Register a setup panel for auto-updates."""
         self.setup_panels.append(panel)
@@ -243,17 +930,11 @@ class MusicPlayer:
 
     async def sync_setup_panels(self):
         """Public method to sync panels with debouncing."""
-        if not hasattr(self, '_sync_lock'):
-            self._sync_lock = False
-            
-        if self._sync_lock:
+        if self.sync_lock.locked():
             return  # Already syncing, skip
-            
-        self._sync_lock = True
-        try:
+
+        async with self.sync_lock:
             await self._internal_sync()
-        finally:
-            self._sync_lock = False
 
     async def _internal_sync(self):
         """Internal sync method that does the actual work."""
@@ -261,10 +942,12 @@ class MusicPlayer:
             return
             
         self.logger.info(f"Panel sync - Active panels: {len(self.setup_panels)}")
+        started = time.perf_counter()
         panels_to_remove = []
         for panel in self.setup_panels:
             try:
-                await panel.sync_panel()
+                with span('panel_sync'):
+                    await panel.sync_panel()
                 # Update button states
                 if hasattr(panel, 'update_button_states'):
                     panel.update_button_states(self)
@@ -275,10 +958,14 @@ class MusicPlayer:
         # Remove invalid panels
         for panel in panels_to_remove:
             self.setup_panels.remove(panel)
+        PANEL_SYNC_SECONDS.observe(time.perf_counter() - started, **self._metric_labels())
 
-    def skip(self):
+    async def skip(self):
         """Skip current song."""
-        if self.voice_client and self.voice_client.is_playing():
+        if self.cancel_opening():
+            # Its stream was still opening, so there is no after_playing to start the next song
+            await self.play_next()
+        elif self.voice_client and self.voice_client.is_playing():
             self.voice_client.stop()
 
     def toggle_loop(self):
@@ -289,6 +976,7 @@ class MusicPlayer:
             self.loop_mode = "queue"
         else:
             self.loop_mode = "off"
+        self._record('loop', mode=self.loop_mode)
         
         return self.loop_mode
 
@@ -296,6 +984,7 @@ class MusicPlayer:
         """Set loop mode directly."""
         if mode in ["off", "current", "queue"]:
             self.loop_mode = mode
+            self._record('loop', mode=mode)
         return self.loop_mode
 
     def set_volume(self, volume):
@@ -326,6 +1015,7 @@ class MusicPlayer:
         try:
             if self.voice_client and self.voice_client.channel:
                 await self.voice_client.channel.edit(status=status)
+                REST_EDITS.inc(kind='channel_status', **self._metric_labels())
                 self.logger.info(f"Updated channel status: {status}")
         except Exception as e:
             self.logger.error(f"Failed to update channel status: {e}")
@@ -343,4 +1033,82 @@ class MusicPlayer:
         await self.disconnect()
         self.queue.clear()
         self.previous_songs.clear()
-        self.setup_panels.clear()
\ No newline at end of file
+        self.setup_panels.clear()
+
+        # Nothing left to resume after an intentional cleanup
+        if self.bot.queue_journal:
+            self.bot.queue_journal.discard(self.guild_id)
+
+    def is_idle(self, idle_for):
+        """Check whether this player holds no playback state and has not been used for ``idle_for`` seconds."""
+        if self.voice_client is not None or self.current_song or not self.queue.is_empty():
+            return False
+        if self.resume_point or self.reconnecting or not self.mailbox.empty():
+            return False
+        if self.actor_task is not None and not self.actor_task.done():
+            return False
+        return time.monotonic() - self.last_active >= idle_for
+
+    def release(self):
+        """Cancel this player's background tasks before it is dropped."""
+        for task in (self.sync_task, self.idle_task, self.prefetch_task, self.watch_task, self.reconnect_task,
+                     self.opening):
+            if task and not task.done():
+                task.cancel()
+        self.setup_panels.clear()
+
+    def detach(self):
+        """Remove this player from the bot, unless it has already been replaced by a new one."""
+        if self.bot.music_players.get(self.guild_id) is self:
+            del self.bot.music_players[self.guild_id]
+
+    def _metric_labels(self):
+        """Get the metric labels for this guild."""
+        return labels_for(self.bot, self.guild_id)
+
+    def _record(self, op, **fields):
+        """Record a player mutation in the queue journal."""
+        if self.bot.queue_journal:
+            self.bot.queue_journal.record(self.guild_id, op, **fields)
+
+    def get_position(self):
+        """Get the playback position of the current song in seconds."""
+        source = self.voice_client.source if self.voice_client else None
+        if source is None or not hasattr(source, 'frames'):
+            return 0.0
+        return source.frames * 0.02
+
+    def journal_state(self):
+        """Get the persistable player state used for journal compaction."""
+        return {
+            'queue': [serialize_song(song) for song in self.queue.get_all()],
+            'loop_mode': self.loop_mode,
+            'current': serialize_song(self.current_song),
+            'position': round(self.get_position(), 2),
+            'channel_id': self.voice_client.channel.id if self.voice_client and self.current_song else None
+        }
+
+    def restore_state(self, state):
+        """Rebuild the queue from a replayed journal state."""
+        guild = self.bot.get_guild(self.guild_id)
+        songs = [deserialize_song(data, guild) for data in state['queue']]
+        # The interrupted song goes back to the front so it plays first, from where it stopped
+        if state['current']:
+            current = deserialize_song(state['current'], guild)
+            if state.get('position'):
+                current['start_at'] = state['position']
+            songs.insert(0, current)
+        self.queue.restore(songs)
+        self.loop_mode = state.get('loop_mode', "off")
+
+        # Rewrite the journal so it matches the restored queue
+        if self.bot.queue_journal:
+            self.bot.queue_journal.compact(self.guild_id, self.journal_state())
+        self.logger.info(f"Restored {len(songs)} queued songs for guild {self.guild_id}")
+
+    async def resume_from_journal(self, channel):
+        """Reconnect and resume a restored queue after a restart."""
+        if self.is_playing or self.queue.is_empty():
+            return
+        if await self.connect(channel):
+            await self.execute(self.play_next)
\ No newline at end of file
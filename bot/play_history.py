@@ -0,0 +1,88 @@
+import difflib
+import re
+from collections import OrderedDict, deque
+from config import Config
+from .queue_journal import JOURNAL_SONG_FIELDS
+from .title_index import tokenize
+
+
+def normalize(text):
+    return " ".join(tokenize(text))
+
+
+def numbers(text):
+    """Get the numbers in a normalized text, in order (part, episode, volume and year numbers)."""
+    return re.findall(r'\d+', text)
+
+
+class PlayHistory:
+    """Bounded per-guild history of resolved tracks.
+
+    Each record keeps the song's metadata and the normalized query that resolved it,
+    so a repeated or slightly misspelt request can be answered without yt-dlp.
+    """
+
+    def __init__(self, max_per_guild=None, max_guilds=None):
+        self.max_per_guild = max_per_guild or Config.PLAY_HISTORY_SIZE
+        self.max_guilds = max_guilds or Config.PLAY_HISTORY_MAX_GUILDS
+        self.guilds = OrderedDict()  # guild_id -> deque of records, least recently active guild first
+
+    def record(self, guild_id, song_info, query=None):
+        """Remember a resolved song for a guild."""
+        if not song_info or not song_info.get('url'):
+            return
+        history = self.guilds.get(guild_id)
+        if history is None:
+            history = self.guilds[guild_id] = deque(maxlen=self.max_per_guild)
+            if len(self.guilds) > self.max_guilds:
+                self.guilds.popitem(last=False)
+        else:
+            self.guilds.move_to_end(guild_id)
+            # Looping a song should not flood the history
+            if history and history[-1]['url'] == song_info['url']:
+                return
+
+        record = {key: song_info.get(key) for key in JOURNAL_SONG_FIELDS}
+        record['query'] = normalize(query) if query and not query.startswith(('http://', 'https://')) else None
+        record['normalized_title'] = normalize(record['title'] or "")
+        history.append(record)
+
+    def lookup(self, guild_id, query):
+        """Find a recently played song that closely matches a query; returns fresh song info or None."""
+        history = self.guilds.get(guild_id)
+        if not history or not query:
+            return None
+
+        if query.startswith(('http://', 'https://')):
+            match = next((record for record in reversed(history) if record['url'] == query), None)
+            return self._song_info(match)
+
+        wanted = normalize(query)
+        if not wanted:
+            return None
+        wanted_numbers = numbers(wanted)
+        best, best_score = None, Config.PLAY_HISTORY_MATCH_RATIO
+        matcher = difflib.SequenceMatcher(b=wanted, autojunk=False)
+        for record in reversed(history):
+            if wanted in (record['query'], record['normalized_title']):
+                return self._song_info(record)
+            for candidate in (record['query'], record['normalized_title']):
+                # "part 1" and "part 2" are close as strings but are different songs
+                if not candidate or numbers(candidate) != wanted_numbers:
+                    continue
+                matcher.set_seq1(candidate)
+                if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                    continue
+                score = matcher.ratio()
+                if score > best_score:
+                    best, best_score = record, score
+        return self._song_info(best)
+
+    @staticmethod
+    def _song_info(record):
+        if record is None:
+            return None
+        return {key: record[key] for key in JOURNAL_SONG_FIELDS}
+
+    def discard(self, guild_id):
+        self.guilds.pop(guild_id, None)
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+# Song fields that are safe to persist (requester is stored separately)
+JOURNAL_SONG_FIELDS = ('title', 'url', 'duration', 'uploader', 'thumbnail', 'platform', 'id')
+
+
+class RestoredRequester:
+    """Stand-in for a requester that is no longer cached after a restart."""
+
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.display_name = name or "Unknown"
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>" if self.id else self.display_name
+
+
+def serialize_song(song_info):
+    """Convert song info into a JSON-safe dict."""
+    if not song_info:
+        return None
+    data = {key: song_info.get(key) for key in JOURNAL_SONG_FIELDS}
+    if song_info.get('start_at'):
+        data['start_at'] = song_info['start_at']  # A queued song that resumes part-way through
+    requester = song_info.get('requester')
+    if requester is not None:
+        data['requester_id'] = getattr(requester, 'id', None)
+        data['requester_name'] = getattr(requester, 'display_name', None)
+    return data
+
+
+def deserialize_song(data, guild=None):
+    """Rebuild song info from a journal entry, resolving the requester if possible."""
+    if not data:
+        return None
+    song_info = {key: data.get(key) for key in JOURNAL_SONG_FIELDS}
+    if data.get('start_at'):
+        song_info['start_at'] = data['start_at']
+    requester_id = data.get('requester_id')
+    requester = guild.get_member(requester_id) if guild and requester_id else None
+    song_info['requester'] = requester or RestoredRequester(requester_id, data.get('requester_name'))
+    return song_info
+
+
+def empty_state():
+    """Return a blank replay state."""
+    return {
+        'queue': [],
+        'loop_mode': "off",
+        'current': None,
+        'position': 0.0,
+        'channel_id': None
+    }
+
+
+def apply_entry(state, entry):
+    """Apply a single journal entry to a replay state."""
+    op = entry.get('op')
+    if op == 'snapshot':
+        state.update({key: entry.get(key, value) for key, value in empty_state().items()})
+    elif op == 'add':
+        state['queue'].append(entry['song'])
+    elif op == 'add_front':
+        state['queue'].insert(0, entry['song'])
+    elif op == 'pop':
+        if state['queue']:
+            state['queue'].pop(0)
+    elif op == 'remove':
+        if 0 <= entry['index'] < len(state['queue']):
+            del state['queue'][entry['index']]
+    elif op == 'clear':
+        state['queue'] = []
+    elif op == 'order':
+        state['queue'] = entry['queue']
+    elif op == 'loop':
+        state['loop_mode'] = entry['mode']
+    elif op == 'current':
+        state['current'] = entry.get('song')
+        state['position'] = entry.get('position', 0.0)
+        state['channel_id'] = entry.get('channel_id')
+    elif op == 'position':
+        state['position'] = entry.get('position', 0.0)
+    return state
+
+
+class QueueJournal:
+    """Append-only journal of queue mutations, one file per guild.
+
+    Entries are serialized on the caller's thread; opening, writing, fsync and
+    replacing the files happen in order on a background writer thread.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or Config.QUEUE_JOURNAL_DIR
+        self.logger = logging.getLogger(__name__)
+        self._files = OrderedDict()  # guild_id -> open journal file, least recently written first (writer thread only)
+        self._entries = {}  # guild_id -> entries written since last snapshot
+        self._queue = queue.SimpleQueue()  # (operation, guild_id, line) for the writer thread
+        os.makedirs(self.directory, exist_ok=True)
+        self._writer = threading.Thread(target=self._write, name="queue-journal", daemon=True)
+        self._writer.start()
+
+    def _path(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}.jsonl")
+
+    def _file(self, guild_id):
+        handle = self._files.get(guild_id)
+        if handle is None:
+            # Only the most recently written journals stay open
+            while len(self._files) >= Config.QUEUE_JOURNAL_OPEN_FILES:
+                self._close(next(iter(self._files)))
+            handle = open(self._path(guild_id), 'a', encoding='utf-8')
+            self._files[guild_id] = handle
+        else:
+            self._files.move_to_end(guild_id)
+        return handle
+
+    def _write(self):
+        """Apply queued journal operations in order (runs on the writer thread)."""
+        while True:
+            operation, guild_id, line = self._queue.get()
+            if operation == 'stop':
+                for open_guild in list(self._files):
+                    self._close(open_guild)
+                return
+            try:
+                if operation == 'append':
+                    handle = self._file(guild_id)
+                    handle.write(line)
+                    handle.flush()
+                elif operation == 'snapshot':
+                    self._write_snapshot(guild_id, line)
+                elif operation == 'discard':
+                    self._close(guild_id)
+                    try:
+                        os.remove(self._path(guild_id))
+                    except FileNotFoundError:
+                        pass
+            except Exception as e:
+                self.logger.error(f"Failed to {operation} queue journal for guild {guild_id}: {e}")
+
+    def _write_snapshot(self, guild_id, line):
+        path = self._path(guild_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._close(guild_id)
+        os.replace(tmp_path, path)
+
+    def record(self, guild_id, op, **fields):
+        """Append a mutation to the guild's journal."""
+        entry = {'op': op, 't': round(time.time(), 3)}
+        entry.update(fields)
+        try:
+            self._queue.put(('append', guild_id, json.dumps(entry, separators=(',', ':')) + "\n"))
+            self._entries[guild_id] = self._entries.get(guild_id, 0) + 1
+        except Exception as e:
+            self.logger.error(f"Failed to write queue journal for guild {guild_id}: {e}")
+
+    def needs_compaction(self, guild_id):
+        """Check whether a journal has grown past the compaction threshold."""
+        return self._entries.get(guild_id, 0) >= Config.QUEUE_JOURNAL_COMPACT_THRESHOLD
+
+    def replay(self, guild_id):
+        """Rebuild the last known state of a guild from its journal."""
+        path = self._path(guild_id)
+        if not os.path.exists(path):
+            return None
+
+        state = empty_state()
+        entries = 0
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave a torn final line - ignore it
+                    continue
+                apply_entry(state, entry)
+                entries += 1
+        self._entries[guild_id] = entries
+        return state
+
+    def load_all(self, owns=None):
+        """Replay every journal on disk, skipping guilds with nothing to restore.
+
+        ``owns`` optionally filters guild IDs so each shard cluster only loads its own guilds.
+        """
+        states = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.jsonl'):
+                continue
+            try:
+                guild_id = int(filename[:-len('.jsonl')])
+            except ValueError:
+                continue
+            if owns and not owns(guild_id):
+                continue
+            state = self.replay(guild_id)
+            if state and (state['queue'] or state['current']):
+                states[guild_id] = state
+            else:
+                self.discard(guild_id)
+        return states
+
+    def compact(self, guild_id, state):
+        """Replace a guild's journal with a single snapshot entry."""
+        if not state['queue'] and not state['current']:
+            self.discard(guild_id)
+            return
+
+        entry = {'op': 'snapshot', 't': round(time.time(), 3)}
+        entry.update(state)
+        try:
+            self._queue.put(('snapshot', guild_id, json.dumps(entry, separators=(',', ':')) + "\n"))
+            self._entries[guild_id] = 1
+        except Exception as e:
+            self.logger.error(f"Failed to compact queue journal for guild {guild_id}: {e}")
+
+    def discard(self, guild_id):
+        """Remove a guild's journal entirely."""
+        self._entries.pop(guild_id, None)
+        self._queue.put(('discard', guild_id, None))
+
+    def _close(self, guild_id):
+        handle = self._files.pop(guild_id, None)
+        if handle:
+            handle.close()
+
+    def close(self):
+        """Write out pending entries and close all open journal files."""
+        if self._writer.is_alive():
+            self._queue.put(('stop', None, None))
+            self._writer.join()
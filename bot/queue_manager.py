@@ -1,55 +1,78 @@
 from collections import deque
 import logging
+from .queue_journal import serialize_song
 
 class QueueManager:
     """Manages the music queue for a guild."""
-    
-    def __init__(self):
+
+    def __init__(self, journal=None, guild_id=None):
         self.queue = deque()
         self.logger = logging.getLogger(__name__)
-    
+        self.journal = journal
+        self.guild_id = guild_id
+
+    def _record(self, op, **fields):
+        """Record a mutation in the queue journal if one is attached."""
+        if self.journal:
+            self.journal.record(self.guild_id, op, **fields)
+
     def add(self, song_info):
         """Add song to queue."""
         self.queue.append(song_info)
+        self._record('add', song=serialize_song(song_info))
         self.logger.info(f"Added to queue: {song_info['title']}")
-    
+
     def add_to_front(self, song_info):
         """Add song to front of queue."""
         self.queue.appendleft(song_info)
-    
+        self._record('add_front', song=serialize_song(song_info))
+
     def get_next(self):
         """Get next song from queue."""
         if self.queue:
+            self._record('pop')
             return self.queue.popleft()
         return None
-    
+
+    def peek(self):
+        """Get the next song without removing it."""
+        return self.queue[0] if self.queue else None
+
     def is_empty(self):
         """Check if queue is empty."""
         return len(self.queue) == 0
-    
+
     def size(self):
         """Get queue size."""
         return len(self.queue)
-    
+
     def clear(self):
         """Clear the queue."""
+        if self.queue:
+            self._record('clear')
         self.queue.clear()
-    
+
     def get_all(self):
         """Get all songs in queue."""
         return list(self.queue)
-    
+
     def remove(self, index):
         """Remove song at specific index."""
         if 0 <= index < len(self.queue):
             song = self.queue[index]
             del self.queue[index]
+            self._record('remove', index=index)
             return song
         return None
-    
+
     def shuffle(self):
         """Shuffle the queue."""
         import random
         queue_list = list(self.queue)
         random.shuffle(queue_list)
         self.queue = deque(queue_list)
+        self._record('order', queue=[serialize_song(song) for song in queue_list])
+
+    def restore(self, songs):
+        """Replace the queue contents without journaling (used on restart)."""
+        self.queue = deque(songs)
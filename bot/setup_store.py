@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+from config import Config
+
+
+class SetupStore:
+    """Setup channel and control panel message of each guild, one small JSON file per guild."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or Config.SETUP_PANEL_DIR
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}.json")
+
+    def save(self, guild_id, channel_id, message_id):
+        """Remember a guild's setup channel and panel message."""
+        path = self._path(guild_id)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump({'channel_id': channel_id, 'message_id': message_id}, handle)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.error(f"Failed to save setup panel for guild {guild_id}: {e}")
+
+    def load_all(self, owns=None):
+        """Load every saved setup panel as guild_id -> {'channel_id', 'message_id'}.
+
+        ``owns`` optionally filters guild IDs so each shard cluster only loads its own guilds.
+        """
+        panels = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                guild_id = int(filename[:-len('.json')])
+            except ValueError:
+                continue
+            if owns and not owns(guild_id):
+                continue
+            try:
+                with open(self._path(guild_id), encoding='utf-8') as handle:
+                    panel = json.load(handle)
+                panels[guild_id] = {'channel_id': int(panel['channel_id']), 'message_id': int(panel['message_id'])}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.logger.error(f"Failed to load setup panel for guild {guild_id}: {e}")
+        return panels
+
+    def discard(self, guild_id):
+        """Forget a guild's setup panel."""
+        try:
+            os.remove(self._path(guild_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,68 @@
+from collections.abc import MutableMapping
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Get the shard ID that owns a guild (Discord's sharding formula)."""
+    return (guild_id >> 22) % max(shard_count or 1, 1)
+
+
+def split_shards(shard_count, clusters):
+    """Split shard IDs into contiguous ranges, one per cluster."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for cluster_id in range(clusters):
+        end = start + size + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+class ShardedGuildMap(MutableMapping):
+    """Guild-keyed mapping partitioned into one dict per shard."""
+
+    def __init__(self, shard_count=1):
+        self.shard_count = max(shard_count or 1, 1)
+        self._shards = {}  # shard_id -> {guild_id: value}
+
+    def _bucket(self, guild_id):
+        return self._shards.setdefault(shard_for_guild(guild_id, self.shard_count), {})
+
+    def __getitem__(self, guild_id):
+        return self._bucket(guild_id)[guild_id]
+
+    def __setitem__(self, guild_id, value):
+        self._bucket(guild_id)[guild_id] = value
+
+    def __delitem__(self, guild_id):
+        del self._bucket(guild_id)[guild_id]
+
+    def __contains__(self, guild_id):
+        return guild_id in self._bucket(guild_id)
+
+    def __iter__(self):
+        for bucket in list(self._shards.values()):
+            yield from list(bucket)
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._shards.values())
+
+    def shard(self, shard_id):
+        """Get the entries owned by a single shard."""
+        return dict(self._shards.get(shard_id, {}))
+
+    def shard_sizes(self):
+        """Get the number of entries per shard."""
+        return {shard_id: len(bucket) for shard_id, bucket in self._shards.items() if bucket}
+
+    def set_shard_count(self, shard_count):
+        """Re-partition entries after the shard count becomes known."""
+        shard_count = max(shard_count or 1, 1)
+        if shard_count == self.shard_count:
+            return
+        items = list(self.items())
+        self.shard_count = shard_count
+        self._shards = {}
+        for guild_id, value in items:
+            self[guild_id] = value
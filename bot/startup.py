@@ -0,0 +1,68 @@
+import ctypes.util
+import logging
+import threading
+import time
+import discord
+
+_opus_attempted = False
+_opus_lock = threading.Lock()  # The warm-up task and the first voice connect can both load Opus
+
+
+def load_opus():
+    """Load the Opus library used to encode voice audio (attempted once per process).
+
+    Concurrent callers wait until the first attempt has finished.
+    """
+    global _opus_attempted
+    with _opus_lock:
+        if _opus_attempted:
+            return
+
+        # Try to load opus library
+        if not discord.opus.is_loaded():
+            # Try different possible opus library names
+            opus_libs = [
+                'libopus.so.0',
+                'libopus.so',
+                'opus',
+                ctypes.util.find_library('opus')
+            ]
+
+            for lib in opus_libs:
+                if lib:
+                    try:
+                        discord.opus.load_opus(lib)
+                        print(f"Successfully loaded opus library: {lib}")
+                        break
+                    except Exception as e:
+                        print(f"Failed to load {lib}: {e}")
+                        continue
+            else:
+                print("Could not load opus library - trying to continue without it")
+        _opus_attempted = True
+
+
+class StartupTimer:
+    """Breaks startup time down into consecutive phases."""
+
+    def __init__(self, started=None):
+        self.started = started or time.perf_counter()
+        self.phases = []  # (name, seconds) in the order they finished
+        self._last_mark = self.started
+
+    def mark(self, name):
+        """End the current phase; it covers the time since the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last_mark))
+        self._last_mark = now
+
+    @property
+    def total(self):
+        return self._last_mark - self.started
+
+    def report(self):
+        """Log how long each phase took."""
+        lines = [f"  {name:<16} {seconds * 1000:>9.1f}ms" for name, seconds in self.phases]
+        logging.getLogger(__name__).info(
+            f"Startup took {self.total:.2f}s:\n" + "\n".join(lines)
+        )
@@ -0,0 +1,78 @@
+import re
+import threading
+from collections import deque
+from config import Config
+
+ERROR_PATTERN = re.compile(
+    r"error|server returned|connection (reset|refused|timed out)|end of file|invalid data|forbidden",
+    re.IGNORECASE
+)
+
+
+class StderrMonitor:
+    """File-like sink for a local ffmpeg's stderr that keeps recent lines and errors.
+
+    discord.py pipes stderr into ``write`` from a reader thread when ``fileno``
+    is unavailable, so nothing here touches the event loop.
+    """
+
+    def __init__(self, max_lines=20):
+        self.lines = deque(maxlen=max_lines)
+        self.errors = 0
+        self.last_error = None
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def fileno(self):
+        raise OSError("stderr is monitored in-process")
+
+    def write(self, data):
+        text = self._partial + data.decode(errors='ignore')
+        *lines, self._partial = re.split(r"[\r\n]", text)
+        with self._lock:
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                self.lines.append(line)
+                if ERROR_PATTERN.search(line):
+                    self.errors += 1
+                    self.last_error = line
+
+    def flush(self):
+        pass
+
+
+def stream_failure(source, song_info, error=None):
+    """Tell why a finished source stopped early, or None if it ended normally or was stopped."""
+    if source is None:
+        return None
+    if getattr(source, 'stalled', False):
+        return 'stall'
+    if error:
+        return 'player_error'
+    if not getattr(source, 'eof', False):
+        return None  # Skipped, stopped or handed over to a crossfade
+    duration = song_info.get('duration')
+    position = getattr(source, 'frames', 0) * 0.02
+    if duration and position < duration - Config.STREAM_EARLY_END_TOLERANCE:
+        return 'early_end'
+    return None
+
+
+def pick_fallback_format(formats, failed_ids, max_abr=None):
+    """Choose the best audio format that has not failed yet.
+
+    Audio-only formats come first, then formats within ``max_abr`` (kbps), then the highest bitrate.
+    """
+    candidates = [
+        fmt for fmt in formats
+        if fmt.get('url') and fmt.get('format_id') not in failed_ids and fmt.get('acodec') != 'none'
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda fmt: (
+        fmt.get('vcodec') != 'none',
+        bool(max_abr) and (fmt.get('abr') or fmt.get('tbr') or 0) > max_abr,
+        -(fmt.get('abr') or fmt.get('tbr') or 0)
+    ))
@@ -0,0 +1,140 @@
+import difflib
+import heapq
+import re
+from collections import OrderedDict, defaultdict
+from config import Config
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PREFIX_INDEX_LENGTH = 3  # Word prefixes up to this long are indexed; longer query words are checked against titles
+LENGTH_SLACK = 2  # Spelling corrections are only looked for among words this much shorter or longer
+CHOICE_LENGTH_LIMIT = 100  # Discord limit for autocomplete choice names and values
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TitleIndex:
+    """In-memory prefix and fuzzy index of resolved track titles, for /play autocomplete.
+
+    Every query word must prefix-match a title word. When that finds too little,
+    misspelt words are corrected with difflib against the indexed words that
+    start with the same letter. Results are ranked by play count. Nothing here
+    touches the network.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or Config.TITLE_INDEX_MAX_ENTRIES
+        self.entries = OrderedDict()  # url -> {'title', 'url', 'plays'}, least recently used first
+        self.prefixes = defaultdict(set)  # word prefix of up to PREFIX_INDEX_LENGTH characters -> urls
+        self.words = defaultdict(set)  # whole word -> urls
+        self.initials = defaultdict(set)  # first letter -> indexed words, the candidates for spelling corrections
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, song_info):
+        """Index a resolved song; returns its entry."""
+        url = song_info.get('url')
+        title = song_info.get('title')
+        if not url or not title:
+            return None
+
+        entry = self.entries.get(url)
+        if entry:
+            self.entries.move_to_end(url)
+            return entry
+
+        entry = {'title': title, 'url': url, 'plays': 0}
+        self.entries[url] = entry
+        for word in set(tokenize(title)):
+            self.words[word].add(url)
+            self.initials[word[0]].add(word)
+            for length in range(1, min(len(word), PREFIX_INDEX_LENGTH) + 1):
+                self.prefixes[word[:length]].add(url)
+
+        if len(self.entries) > self.max_entries:
+            self._evict(next(iter(self.entries)))
+        return entry
+
+    def record_play(self, song_info):
+        """Count a play of a song so it ranks higher."""
+        entry = self.add(song_info)
+        if entry:
+            entry['plays'] += 1
+
+    def _evict(self, url):
+        entry = self.entries.pop(url)
+        for word in set(tokenize(entry['title'])):
+            self._discard(self.words, word, url)
+            if word not in self.words:
+                self._discard(self.initials, word[0], word)
+            for length in range(1, min(len(word), PREFIX_INDEX_LENGTH) + 1):
+                self._discard(self.prefixes, word[:length], url)
+
+    @staticmethod
+    def _discard(index, key, value):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    def _match(self, words):
+        """Get urls whose titles have a word starting with each query word."""
+        matches = None
+        for word in words:
+            if len(word) <= PREFIX_INDEX_LENGTH:
+                urls = self.prefixes.get(word)
+            else:
+                # Longer prefixes are not indexed; expand them over the words with the same first letter
+                urls = set().union(*(
+                    self.words[candidate] for candidate in self.initials.get(word[0], ())
+                    if candidate.startswith(word)
+                ))
+            if not urls:
+                return set()
+            matches = set(urls) if matches is None else matches & urls
+            if not matches:
+                return set()
+        return matches or set()
+
+    def _close_words(self, word, n, cutoff):
+        """Find indexed words spelt like ``word``, among those with the same first letter and a similar length."""
+        candidates = [
+            candidate for candidate in self.initials.get(word[0], ())
+            if abs(len(candidate) - len(word)) <= LENGTH_SLACK
+        ]
+        return difflib.get_close_matches(word, candidates, n=n, cutoff=cutoff)
+
+    def search(self, query, limit=25):
+        """Find indexed songs matching a partially typed query, most played first."""
+        words = tokenize(query)
+        if not words:
+            return heapq.nsmallest(limit, self.entries.values(), key=lambda entry: -entry['plays'])
+
+        urls = self._match(words)
+        if len(urls) < limit:
+            # Correct misspelt words against the vocabulary; the last word may still be incomplete
+            corrected = []
+            for word in words[:-1]:
+                corrected.append(word if word in self.words else next(
+                    iter(self._close_words(word, n=1, cutoff=0.75)), word
+                ))
+            corrected.append(words[-1])
+            if corrected != words:
+                urls |= self._match(corrected)
+            if not urls and len(query) >= 3:
+                close = self._close_words(words[-1], n=5, cutoff=0.7)
+                urls = set().union(*(self.words[word] for word in close)) if close else set()
+
+        return heapq.nsmallest(
+            limit, (self.entries[url] for url in urls), key=lambda entry: (-entry['plays'], entry['title'])
+        )
+
+    @staticmethod
+    def choice_value(entry):
+        """Value sent back when a suggestion is picked: the URL if it fits, else the title."""
+        if len(entry['url']) <= CHOICE_LENGTH_LIMIT:
+            return entry['url']
+        return entry['title'][:CHOICE_LENGTH_LIMIT]
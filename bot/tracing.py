@@ -0,0 +1,122 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from config import Config
+
+# Span that new spans in the current task attach to
+current_span = contextvars.ContextVar('konoha_current_span', default=None)
+
+
+class Span:
+    """A timed step of a request; spans of one request share a trace ID."""
+
+    def __init__(self, name, trace_id=None, parent_id=None, **attributes):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def child(self, name, **attributes):
+        """Create a child span in the same trace."""
+        return Span(name, self.trace_id, self.span_id, **attributes)
+
+    def end(self, **attributes):
+        """Finish the span and export it (safe to call from any thread)."""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        self.attributes.update(attributes)
+        if exporter:
+            exporter.export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes
+        }
+
+
+class SpanExporter:
+    """Writes finished spans to a JSONL file from a background thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=self._write, name="trace-exporter", daemon=True).start()
+
+    def export(self, span):
+        self._queue.put(span.to_dict())
+
+    def _write(self):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            while True:
+                record = self._queue.get()
+                try:
+                    handle.write(json.dumps(record, default=str) + "\n")
+                    handle.flush()
+                except Exception as e:
+                    logging.getLogger(__name__).error(f"Failed to export span: {e}")
+
+
+exporter = SpanExporter(Config.TRACE_FILE) if Config.TRACE_FILE else None
+
+
+def start_trace(name, **attributes):
+    """Create the root span of a new trace; returns None when tracing is off."""
+    if not exporter:
+        return None
+    return Span(name, **attributes)
+
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """Time a block as a child of ``parent`` or of the current span."""
+    parent = parent or current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name, **attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attributes['error'] = repr(e)
+        raise
+    finally:
+        current_span.reset(token)
+        child.end()
+
+
+@contextmanager
+def trace(name, **attributes):
+    """Run a block as the root span of a new trace."""
+    root = start_trace(name, **attributes)
+    if root is None:
+        yield None
+        return
+
+    token = current_span.set(root)
+    try:
+        yield root
+    finally:
+        current_span.reset(token)
+        root.end()
@@ -1,8 +1,59 @@
+import audioop
 import discord
-import yt_dlp
 import asyncio
+import functools
 import logging
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from .metrics import EXTRACTION_IN_FLIGHT, EXTRACTION_WORKERS
+from .stream_watchdog import StderrMonitor
+from .tracing import span
+
+# Dedicated pool so extraction load is bounded and its saturation is observable
+EXTRACTION_EXECUTOR = ThreadPoolExecutor(
+    max_workers=Config.EXTRACTION_WORKERS,
+    thread_name_prefix='ytdl-extract'
+)
+EXTRACTION_WORKERS.set(Config.EXTRACTION_WORKERS)
+
+_yt_dlp = None
+
+def get_yt_dlp():
+    """Import yt-dlp on first use; importing it loads hundreds of extractor modules."""
+    global _yt_dlp
+    if _yt_dlp is None:
+        import yt_dlp
+        _yt_dlp = yt_dlp
+    return _yt_dlp
+
+async def load_yt_dlp():
+    """Get the yt-dlp module without importing it on the event loop."""
+    if _yt_dlp is not None:
+        return _yt_dlp
+    return await asyncio.get_running_loop().run_in_executor(EXTRACTION_EXECUTOR, get_yt_dlp)
+
+async def run_extraction(func, loop=None):
+    """Run a blocking yt-dlp call in the extraction pool."""
+    loop = loop or asyncio.get_event_loop()
+    EXTRACTION_IN_FLIGHT.inc()
+    try:
+        return await loop.run_in_executor(EXTRACTION_EXECUTOR, func)
+    finally:
+        EXTRACTION_IN_FLIGHT.dec()
+
+def format_selector(bitrate=None):
+    """Get the yt-dlp format selector for a voice channel bitrate in kbps.
+
+    Picks the best audio the channel can carry, or the smallest audio format when
+    nothing is that small. Formats without a known bitrate are always allowed.
+    """
+    default = Config.YTDL_OPTIONS['format']
+    if not bitrate:
+        return default
+    limit = int(bitrate * Config.FORMAT_BITRATE_HEADROOM)
+    return f"bestaudio[abr<=?{limit}][ext=webm]/bestaudio[abr<=?{limit}]/worstaudio/{default}"
 
 class YTDLSource(discord.PCMVolumeTransformer):
     """Audio source for YouTube videos."""
@@ -14,43 +65,99 @@ class YTDLSource(discord.PCMVolumeTransformer):
         self.url = data.get('url')
         self.duration = data.get('duration')
         self.uploader = data.get('uploader')
+        self.frames = 0  # 20ms PCM frames read so far
+        self.on_first_frame = None  # Called from the player thread on the first frame
+        self._buffer = deque()  # Raw PCM frames read ahead by prebuffer()
+        self.gain = 1.0  # Loudness normalization gain, applied on top of the volume
+        self.meter = None  # LoudnessMeter while this play is being measured
+        self.stderr_monitor = None  # StderrMonitor of the local ffmpeg
+        self.eof = False  # ffmpeg's output ended (as opposed to the player being stopped)
+        self.stalled = False  # Cut by the stream watchdog
+
+    def prebuffer(self, frames):
+        """Read up to ``frames`` frames ahead so playback starts from memory (blocking)."""
+        for _ in range(frames - len(self._buffer)):
+            data = self.original.read()
+            if not data:
+                break
+            self._buffer.append(data)
+
+    def read(self):
+        """Read a frame and advance the playback position."""
+        data = self._buffer.popleft() if self._buffer else self.original.read()
+        if not data:
+            self.eof = True
+        if self.meter is not None and data:
+            self.meter.add(data)
+        ret = audioop.mul(data, 2, min(self.volume * self.gain, 2.0))
+        if ret:
+            self.frames += 1
+            if self.frames == 1 and self.on_first_frame:
+                self.on_first_frame()
+        return ret
         
     @classmethod
-    async def create_source(cls, url, *, loop=None, volume=0.5):
-        """Create audio source from URL."""
+    async def create_source(cls, url, *, loop=None, volume=0.5, audio_workers=None, position=0.0, bitrate=None):
+        """Create audio source from URL, starting ``position`` seconds in.
+
+        When an audio worker pool is given, the ffmpeg pipeline runs in a worker process.
+        ``bitrate`` is the voice channel bitrate in kbps the stream format is chosen for.
+        """
         loop = loop or asyncio.get_event_loop()
         
-        ytdl = yt_dlp.YoutubeDL(Config.YTDL_OPTIONS)
+        ytdl_options = Config.YTDL_OPTIONS
+        if bitrate:
+            ytdl_options = {**ytdl_options, 'format': format_selector(bitrate)}
+        ytdl = (await load_yt_dlp()).YoutubeDL(ytdl_options)
         
         try:
-            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=False))
+            with span('extract'):
+                data = await run_extraction(lambda: ytdl.extract_info(url, download=False), loop)
             
             if 'entries' in data:
                 # Take first item from playlist
                 data = data['entries'][0]
             
-            filename = data['url']
-            
-            # Create FFmpeg source with proper executable path
-            ffmpeg_options = Config.FFMPEG_OPTIONS.copy()
-            ffmpeg_options['executable'] = 'ffmpeg'
-            
-            return cls(
-                discord.FFmpegPCMAudio(filename, **ffmpeg_options),
-                data=data,
-                volume=volume
-            )
+            with span('ffmpeg_spawn', worker=bool(audio_workers)):
+                # Spawning ffmpeg or connecting to a worker blocks - keep it off the event loop
+                return await loop.run_in_executor(None, functools.partial(
+                    cls.open_stream, data,
+                    volume=volume, audio_workers=audio_workers, position=position, bitrate=bitrate
+                ))
         except Exception as e:
             logging.error(f"Error creating audio source: {e}")
             logging.error(f"URL: {url}")
             logging.error(f"Data: {data if 'data' in locals() else 'No data'}")
             return None
     
+    @classmethod
+    def open_stream(cls, data, *, volume=0.5, audio_workers=None, position=0.0, bitrate=None):
+        """Open a source for already extracted info without extracting again (blocking)."""
+        if audio_workers:
+            return audio_workers.create_source(
+                data['url'], data=data, volume=volume, bitrate=bitrate or 128, position=position
+            )
+        return cls.from_stream(data['url'], data=data, volume=volume, position=position)
+
+    @classmethod
+    def from_stream(cls, stream_url, *, data, volume=0.5, position=0.0):
+        """Start a local ffmpeg pipeline for an already resolved stream URL (blocking)."""
+        # Create FFmpeg source with proper executable path
+        ffmpeg_options = Config.FFMPEG_OPTIONS.copy()
+        ffmpeg_options['executable'] = 'ffmpeg'
+        if position:
+            # Input seeking: ffmpeg jumps straight to the offset
+            ffmpeg_options['before_options'] = f"-ss {position:.2f} {ffmpeg_options['before_options']}"
+
+        monitor = StderrMonitor()
+        source = cls(discord.FFmpegPCMAudio(stream_url, stderr=monitor, **ffmpeg_options), data=data, volume=volume)
+        source.frames = int(position * 50)
+        source.stderr_monitor = monitor
+        return source
+
     @classmethod
     async def search(cls, query):
         """Search for a song and return info from multiple platforms."""
-        loop = asyncio.get_event_loop()
-        
         # Faster YTDL options for quicker searches
         fast_ytdl_options = Config.YTDL_OPTIONS.copy()
         fast_ytdl_options.update({
@@ -59,7 +166,7 @@ class YTDLSource(discord.PCMVolumeTransformer):
             'quiet': True,
             'skip_download': True
         })
-        ytdl = yt_dlp.YoutubeDL(fast_ytdl_options)
+        ytdl = (await load_yt_dlp()).YoutubeDL(fast_ytdl_options)
         
         try:
             # Handle different types of queries
@@ -68,17 +175,18 @@ class YTDLSource(discord.PCMVolumeTransformer):
                 platform = cls._detect_platform(query)
                 if platform == 'spotify':
                     # For Spotify URLs, convert to YouTube search
-                    youtube_query = await cls._convert_spotify_to_youtube(query)
+                    with span('spotify_convert'):
+                        youtube_query = await cls._convert_spotify_to_youtube(query)
                     if youtube_query:
-                        data = await loop.run_in_executor(None, lambda: ytdl.extract_info(youtube_query, download=False))
+                        data = await run_extraction(lambda: ytdl.extract_info(youtube_query, download=False))
                     else:
                         return None
                 else:
-                    data = await loop.run_in_executor(None, lambda: ytdl.extract_info(query, download=False))
+                    data = await run_extraction(lambda: ytdl.extract_info(query, download=False))
             else:
                 # Text search - use YouTube first for speed
                 search_query = f"ytsearch1:{query}"
-                data = await loop.run_in_executor(None, lambda: ytdl.extract_info(search_query, download=False))
+                data = await run_extraction(lambda: ytdl.extract_info(search_query, download=False))
             
             if 'entries' in data and data['entries']:
                 # Take first search result
@@ -92,7 +200,8 @@ class YTDLSource(discord.PCMVolumeTransformer):
                 'duration': data.get('duration'),
                 'uploader': data.get('uploader', 'Unknown'),
                 'thumbnail': data.get('thumbnail'),
-                'platform': cls._detect_platform(data.get('webpage_url', ''))
+                'platform': cls._detect_platform(data.get('webpage_url', '')),
+                'id': data.get('id')
             }
         except Exception as e:
             logging.error(f"Error searching for song: {e}")
@@ -114,8 +223,7 @@ class YTDLSource(discord.PCMVolumeTransformer):
         """Convert Spotify URL to YouTube search query."""
         try:
             # Extract track info from Spotify URL using yt-dlp
-            loop = asyncio.get_event_loop()
-            ytdl = yt_dlp.YoutubeDL({
+            ytdl = (await load_yt_dlp()).YoutubeDL({
                 'quiet': True, 
                 'no_warnings': True,
                 'extract_flat': False,
@@ -123,7 +231,7 @@ class YTDLSource(discord.PCMVolumeTransformer):
             })
             
             # Try to extract Spotify track info
-            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(spotify_url, download=False))
+            data = await run_extraction(lambda: ytdl.extract_info(spotify_url, download=False))
             
             if data:
                 title = data.get('title', '')
@@ -170,6 +278,27 @@ def format_duration(seconds):
     else:
         return f"{minutes:02d}:{seconds:02d}"
 
+def parse_timestamp(text):
+    """Parse a position like '90', '1:30' or '1:02:30' into seconds; returns None if invalid.
+
+    >>> parse_timestamp('1:02:30')
+    3750.0
+    >>> [parse_timestamp(text) for text in ('inf', 'nan', '1:-inf', '-5', '1:2:3:4')]
+    [None, None, None, None, None]
+    """
+    try:
+        parts = [float(part) for part in text.strip().split(':')]
+    except ValueError:
+        return None
+    # float() also accepts 'inf' and 'nan', which would reach ffmpeg as -ss inf
+    if len(parts) > 3 or any(part < 0 or not math.isfinite(part) for part in parts):
+        return None
+
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
 def create_embed(title, description, color=discord.Color.blue()):
     """Create a standard embed."""
     embed = discord.Embed(
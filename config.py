@@ -49,4 +49,111 @@ class Config:
     FFMPEG_OPTIONS = {
         'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -nostdin',
         'options': '-vn'
-    }
\ No newline at end of file
+    }
+
+    # Persistent data directory (queue journals, caches, setup panels)
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+
+    # Queue journal settings (crash-safe queue persistence)
+    QUEUE_JOURNAL_ENABLED = os.getenv("QUEUE_JOURNAL_ENABLED", "true").lower() == "true"
+    QUEUE_JOURNAL_DIR = os.path.join(DATA_DIR, "queues")
+    QUEUE_JOURNAL_COMPACT_INTERVAL = 30  # Seconds between compaction passes
+    QUEUE_JOURNAL_COMPACT_THRESHOLD = 200  # Entries before a journal is compacted
+    QUEUE_JOURNAL_OPEN_FILES = 64  # Journal files kept open for appending
+    QUEUE_RESTORE_STAGGER = 2.0  # Seconds between resuming guilds that were playing
+
+    # Setup channels and control panel messages, restored without REST calls on startup
+    SETUP_PANEL_DIR = os.path.join(DATA_DIR, "setup_panels")
+
+    # Sharding settings (SHARD_COUNT unset = Discord's recommended count)
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+    SHARD_CLUSTERS = int(os.getenv("SHARD_CLUSTERS", "1"))  # Worker processes running shards
+    CLUSTER_REPORT_INTERVAL = 30  # Seconds between per-cluster load reports
+    CLUSTER_RESTART_DELAY = 10  # Seconds before restarting a crashed cluster
+    CLUSTER_SHUTDOWN_TIMEOUT = 15  # Seconds a cluster gets to shut down before it is killed
+
+    # Out-of-process audio workers (0 = decode and encode in the bot process)
+    AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "0"))
+    AUDIO_WORKER_CHECK_INTERVAL = 5  # Seconds between checks for exited workers
+
+    # Metrics endpoint (Prometheus text format, METRICS_PORT unset = disabled)
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+    METRICS_MAX_GUILD_LABELS = 50  # Guilds beyond this are exported as guild="other"
+
+    # Thread pool used for yt-dlp extraction
+    EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "8"))
+
+    # Event loop watchdog
+    LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+    LOOP_MONITOR_INTERVAL = 0.25  # Seconds between heartbeats
+    LOOP_STALL_THRESHOLD = 0.25  # Seconds a heartbeat may be late before it counts as a stall
+    LOOP_STALL_SAMPLE_INTERVAL = 0.02  # Seconds between stack samples during a stall
+    LOOP_STALL_HISTORY = 20  # Stall reports kept for /loopstats
+    LOOP_STALL_STACK_DEPTH = 12  # Frames kept per sampled stack
+
+    # Slash command sync (skipped when the command tree hash is unchanged)
+    COMMAND_HASH_FILE = os.path.join(DATA_DIR, "command_tree.json")
+    FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "false").lower() == "true"
+
+    # /play autocomplete index of resolved titles
+    TITLE_INDEX_MAX_ENTRIES = 5000  # Least recently used titles are dropped beyond this
+    AUTOCOMPLETE_LIMIT = 25  # Discord shows at most 25 choices
+
+    # Prefetch: spawn and pre-buffer the next song's ffmpeg pipeline before the current one ends
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_LEAD_SECONDS = 5  # Seconds before the end of a song to start the next pipeline
+    PREFETCH_BUFFER_FRAMES = 50  # 20ms frames read ahead into memory (local ffmpeg only)
+
+    # Crossfade between songs (0 = hard cuts); needs the next song to be prefetched in time
+    CROSSFADE_SECONDS = float(os.getenv("CROSSFADE_SECONDS", "0"))
+
+    # Loudness normalization (/normalize); a track is measured on its first normalized play
+    NORMALIZE_DEFAULT = os.getenv("NORMALIZE_DEFAULT", "false").lower() == "true"
+    LOUDNESS_CACHE_FILE = os.path.join(DATA_DIR, "loudness.json")
+    LOUDNESS_TARGET_RMS = 3000  # Target level of 16-bit PCM (about -21 dBFS)
+    LOUDNESS_SILENCE_RMS = 300  # Frames below this level are left out of the measurement
+    LOUDNESS_MIN_SECONDS = 20  # Audio needed before a measurement is cached
+    LOUDNESS_MIN_GAIN = 0.25
+    LOUDNESS_MAX_GAIN = 2.0
+    LOUDNESS_SAVE_INTERVAL = 60  # Seconds between writes of the loudness cache
+
+    # Voice reconnect after a dropped connection or Repair (exponential backoff)
+    VOICE_RECONNECT_ATTEMPTS = 5
+    VOICE_RECONNECT_BASE_DELAY = 2  # Seconds before the second attempt, doubled after each failure
+    VOICE_RECONNECT_MAX_DELAY = 30
+    VOICE_LIBRARY_RECONNECT_TIMEOUT = 20  # Seconds discord.py gets to restore a dropped connection itself
+
+    # Pick stream formats and the Opus bitrate to match the voice channel's bitrate
+    MATCH_CHANNEL_BITRATE = os.getenv("MATCH_CHANNEL_BITRATE", "true").lower() == "true"
+    FORMAT_BITRATE_HEADROOM = 1.25  # Source formats may exceed the channel bitrate by this factor
+
+    # Setup channel chatter is deleted in bulk per channel on this timer (seconds)
+    DELETE_BATCH_INTERVAL = 1.0
+
+    # Stream watchdog: a stalled or broken stream is reopened at its position, switching formats if it keeps failing
+    STREAM_CHECK_INTERVAL = 2  # Seconds between throughput checks
+    STREAM_STALL_TIMEOUT = 10  # Seconds of too little audio before a stream counts as stalled
+    STREAM_MIN_THROUGHPUT = 0.5  # Fraction of real time a stream must deliver
+    STREAM_EARLY_END_TOLERANCE = 10  # Seconds before the known duration an ended stream counts as broken
+    STREAM_MAX_RECOVERIES = 3  # Recoveries per song before skipping it
+
+    # Per-guild play history (repeat requests resolve locally, /previous goes back this far)
+    PLAY_HISTORY_SIZE = 200  # Songs remembered per guild
+    PLAY_HISTORY_MAX_GUILDS = 10000  # Least recently active guilds are forgotten beyond this
+    PLAY_HISTORY_MATCH_RATIO = 0.85  # Minimum similarity for a query to reuse a remembered song
+
+    # Disconnected players with nothing queued are dropped after this long without a command
+    PLAYER_IDLE_TIMEOUT = int(os.getenv("PLAYER_IDLE_TIMEOUT", "300"))
+    PLAYER_SWEEP_INTERVAL = 60  # Seconds between idle player sweeps
+
+    # Memory accounting (/memory and the memory gauges on the metrics endpoint)
+    MEMORY_METRICS_ENABLED = os.getenv("MEMORY_METRICS_ENABLED", "false").lower() == "true"
+    MEMORY_METRICS_INTERVAL = int(os.getenv("MEMORY_METRICS_INTERVAL", "300"))  # Seconds between estimates
+    MEMORY_SAMPLE_SIZE = 200  # Items of large shared caches measured; the rest is extrapolated
+    MEMORY_TOP_GUILDS = 10  # Guilds listed by /memory
+    TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))  # Stack frames kept per allocation
+    TRACEMALLOC_TOP = 10  # Allocation sites shown per snapshot diff
+
+    # Request tracing (TRACE_FILE unset = disabled)
+    TRACE_FILE = os.getenv("TRACE_FILE")  # e.g. data/traces.jsonl
@@ -1,6 +1,16 @@
+import time
+
+# Taken before the heavy imports so the startup report covers them
+STARTED = time.perf_counter()
+
 import asyncio
 import logging
+import multiprocessing
+import queue
+import signal
+import discord
 from bot.music_bot import MusicBot
+from bot.sharding import split_shards
 from config import Config
 
 # Configure logging
@@ -9,15 +19,107 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-async def main():
+async def main(shard_ids=None, shard_count=None, cluster_id=None, load_reports=None):
     """Main entry point for the Discord music bot."""
     try:
         # Initialize and run the bot
-        bot = MusicBot()
+        bot = MusicBot(
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            cluster_id=cluster_id,
+            load_reports=load_reports,
+            started=STARTED
+        )
         await bot.start(Config.DISCORD_TOKEN)
     except Exception as e:
         logging.error(f"Failed to start bot: {e}")
         raise
 
+def run_cluster(cluster_id, shard_ids, shard_count, load_reports):
+    """Run one shard cluster in a worker process."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - cluster {cluster_id} - %(name)s - %(levelname)s - %(message)s'
+    )
+    # Shut down on terminate() like on Ctrl+C, so the cluster's audio workers are stopped too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(main(shard_ids, shard_count, cluster_id, load_reports))
+    except KeyboardInterrupt:
+        pass
+
+async def fetch_recommended_shard_count():
+    """Ask Discord for the recommended shard count."""
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(Config.DISCORD_TOKEN)
+        shard_count, _, _ = await http.get_bot_gateway()
+        return shard_count
+    finally:
+        await http.close()
+
+def launch_clusters():
+    """Launch shard clusters across worker processes and log their load."""
+    shard_count = Config.SHARD_COUNT or asyncio.run(fetch_recommended_shard_count())
+    clusters = split_shards(shard_count, Config.SHARD_CLUSTERS)
+    logging.info(f"Launching {len(clusters)} clusters for {shard_count} shards")
+
+    context = multiprocessing.get_context('spawn')
+    load_reports = context.Queue()
+    processes = {}
+
+    def start(cluster_id):
+        process = context.Process(
+            target=run_cluster,
+            args=(cluster_id, clusters[cluster_id], shard_count, load_reports),
+            # Not a daemon: daemonic processes cannot start audio workers
+            name=f"konoha-cluster-{cluster_id}"
+        )
+        process.start()
+        processes[cluster_id] = process
+        logging.info(f"Started cluster {cluster_id} (shards {clusters[cluster_id]}) as pid {process.pid}")
+
+    for cluster_id in range(len(clusters)):
+        start(cluster_id)
+
+    crashed_at = {}
+    try:
+        while True:
+            try:
+                report = load_reports.get(timeout=1)
+                logging.info(
+                    f"Cluster {report['cluster_id']} load: {report['guilds']} guilds, "
+                    f"{report['players']} players, {report['voice_clients']} voice clients, "
+                    f"latency {report['latency_ms']}ms"
+                )
+            except queue.Empty:
+                pass
+
+            # Restart clusters that exited, after a short delay
+            for cluster_id, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                crashed_at.setdefault(cluster_id, time.monotonic())
+                if time.monotonic() - crashed_at[cluster_id] >= Config.CLUSTER_RESTART_DELAY:
+                    logging.warning(f"Cluster {cluster_id} exited with code {process.exitcode}, restarting")
+                    del crashed_at[cluster_id]
+                    start(cluster_id)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Cluster processes are not daemons, so stop them explicitly
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for cluster_id, process in processes.items():
+            process.join(Config.CLUSTER_SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                logging.warning(f"Cluster {cluster_id} did not shut down, killing it")
+                process.kill()
+                process.join()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    if Config.SHARD_CLUSTERS > 1:
+        launch_clusters()
+    else:
+        asyncio.run(main(shard_count=Config.SHARD_COUNT))